@@ -0,0 +1,9 @@
+import pytest
+from django.core.cache import cache
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    # Кэш сбрасывается после коммита (transaction.on_commit), а тест
+    # с django_db не коммитит: кэш прошлого теста не должен протекать.
+    cache.clear()
@@ -0,0 +1,14 @@
+import pytest
+
+from benchmarks import budget
+
+pytestmark = [pytest.mark.django_db]
+
+
+def test_routes_fit_query_budget():
+    budget.load_dataset()
+    problems = budget.check(budget.measure(), budget.load())
+    assert not problems, '\n'.join([
+        'Бюджет SQL превышен:', *problems,
+        'Если рост оправдан: manage.py update_query_budget',
+    ])
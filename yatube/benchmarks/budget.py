@@ -0,0 +1,120 @@
+"""Бюджет SQL для каждого маршрута posts.urls и users.urls.
+
+Страницы открываются анонимом и авторизованным пользователем на
+наборе данных DataGenerator с постоянным seed, при пустом кэше. Число
+запросов и время SQL сравниваются с BUDGET_FILE: запросов не больше,
+чем в бюджете, время — с запасом на шумные CI-машины. Пересчитать
+бюджет после оправданного изменения: manage.py update_query_budget.
+"""
+import json
+import os
+import tempfile
+
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core.loader import BulkLoader
+from posts import urls as posts_urls
+from users import urls as users_urls
+
+from .generator import DataGenerator
+from .scenarios import pick_objects
+
+BUDGET_FILE = os.path.join(os.path.dirname(__file__), 'query_budget.json')
+DATASET = {
+    'users': 60, 'groups': 5, 'posts': 400, 'comments': 800,
+    'follows': 300, 'seed': 18,
+}
+URLCONFS = (posts_urls, users_urls)
+VARIANTS = ('anonymous', 'authorized')
+SQL_TIME_FACTOR = 3
+SQL_TIME_SLACK_MS = 25.0
+
+
+def load_dataset():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'budget.json')
+        DataGenerator(**DATASET).write(path)
+        BulkLoader(DEFAULT_DB_ALIAS).load([path])
+
+
+def route_urls(objects) -> dict:
+    """URL каждого именованного маршрута, параметры — из objects."""
+    values = {
+        'slug': objects['group'].slug,
+        'username': objects['author'].username,
+        'post_id': objects['post'].pk,
+    }
+    urls = {}
+    for urlconf in URLCONFS:
+        for pattern in urlconf.urlpatterns:
+            name = f'{urlconf.app_name}:{pattern.name}'
+            kwargs = dict(values)
+            if name == 'posts:post_edit':
+                kwargs['post_id'] = objects['own_post'].pk
+            missing = set(pattern.pattern.converters) - set(kwargs)
+            if missing:
+                raise ValueError(f'{name}: нет значений для {missing}')
+            urls[name] = reverse(name, kwargs={
+                param: kwargs[param] for param in pattern.pattern.converters
+            })
+    return urls
+
+
+def measure() -> dict:
+    objects = pick_objects()
+    results = {}
+    for name, url in route_urls(objects).items():
+        for variant in VARIANTS:
+            client = Client()
+            if variant == 'authorized':
+                client.force_login(objects['viewer'])
+            cache.clear()
+            with CaptureQueriesContext(connection) as context:
+                client.get(url).close()
+            results[f'{name} {variant}'] = {
+                'queries': len(context.captured_queries),
+                'sql_ms': round(sum(
+                    (float(query['time'])
+                     for query in context.captured_queries), 0.0
+                ) * 1000, 1),
+            }
+    return results
+
+
+def load() -> dict:
+    with open(BUDGET_FILE, encoding='utf-8') as file:
+        return json.load(file)
+
+
+def save(results):
+    with open(BUDGET_FILE, 'w', encoding='utf-8') as file:
+        json.dump(results, file, indent=2, sort_keys=True)
+        file.write('\n')
+
+
+def check(results, budget) -> list:
+    """Превышения бюджета в виде строк для сообщения об ошибке."""
+    problems = []
+    for key, actual in results.items():
+        allowed = budget.get(key)
+        if allowed is None:
+            problems.append(f'{key}: нет в бюджете')
+            continue
+        if actual['queries'] > allowed['queries']:
+            problems.append(
+                f'{key}: {actual["queries"]} запросов, '
+                f'бюджет {allowed["queries"]}'
+            )
+        limit = allowed['sql_ms'] * SQL_TIME_FACTOR + SQL_TIME_SLACK_MS
+        if actual['sql_ms'] > limit:
+            problems.append(
+                f'{key}: SQL {actual["sql_ms"]} мс, предел {limit:.1f} мс'
+            )
+    problems.extend(
+        f'{key}: маршрута больше нет' for key in budget.keys() - results.keys()
+    )
+    return problems
@@ -0,0 +1,142 @@
+"""Синтетические данные в формате dump.json (manage.py dumpdata).
+
+Объекты пишутся в файл потоком, поэтому размер данных ограничен только
+диском: миллионы постов загружаются командой bulkload. Тексты Faker
+генерирует один раз в пул и дальше выбирает из него, иначе генерация
+миллиона постов заняла бы больше времени, чем их загрузка. Авторы
+постов и подписок выбираются по закону Ципфа: несколько популярных
+авторов и длинный хвост, как на живом сайте.
+"""
+import itertools
+import json
+import os
+import random
+from datetime import datetime, timedelta, timezone
+
+from faker import Faker
+
+from core.loader import OPENERS
+
+TEXT_POOL_SIZE: int = 1000
+WRITE_CHUNK: int = 1000
+PASSWORD = '!'
+START = datetime(2021, 1, 1, tzinfo=timezone.utc)
+PERIOD = timedelta(days=365)
+
+
+class DataGenerator:
+    def __init__(self, users=1000, groups=20, posts=10000,
+                 comments=30000, follows=20000, seed=0):
+        self.sizes = {
+            'users': users,
+            'groups': groups,
+            'posts': posts,
+            'comments': comments,
+            'follows': min(follows, users * (users - 1) // 2),
+        }
+        self.random = random.Random(seed)
+        self.faker = Faker('ru_RU')
+        self.faker.seed_instance(seed)
+        self.texts = [self.faker.paragraph(nb_sentences=3)
+                      for _ in range(TEXT_POOL_SIZE)]
+        self.author_weights = list(itertools.accumulate(
+            1 / rank for rank in range(1, users + 1)
+        ))
+
+    def _date(self):
+        return (
+            START + self.random.random() * PERIOD
+        ).isoformat().replace('+00:00', 'Z')
+
+    def _author(self) -> int:
+        return self.random.choices(
+            range(1, self.sizes['users'] + 1), cum_weights=self.author_weights
+        )[0]
+
+    def users(self):
+        for pk in range(1, self.sizes['users'] + 1):
+            yield {'model': 'auth.user', 'pk': pk, 'fields': {
+                'username': f'user{pk}',
+                'first_name': self.faker.first_name(),
+                'last_name': self.faker.last_name(),
+                'password': PASSWORD,
+                'date_joined': START.isoformat().replace('+00:00', 'Z'),
+            }}
+
+    def groups(self):
+        for pk in range(1, self.sizes['groups'] + 1):
+            yield {'model': 'posts.group', 'pk': pk, 'fields': {
+                'title': self.faker.catch_phrase()[:200],
+                'slug': f'group-{pk}',
+                'description': self.random.choice(self.texts),
+            }}
+
+    def posts(self):
+        groups = self.sizes['groups']
+        for pk in range(1, self.sizes['posts'] + 1):
+            group = self.random.randint(0, groups)
+            yield {'model': 'posts.post', 'pk': pk, 'fields': {
+                'text': self.random.choice(self.texts),
+                'pub_date': self._date(),
+                'author': self._author(),
+                'group': group or None,
+                'image': '',
+            }}
+
+    def comments(self):
+        posts = self.sizes['posts']
+        if not posts:
+            return
+        for pk in range(1, self.sizes['comments'] + 1):
+            yield {'model': 'posts.comment', 'pk': pk, 'fields': {
+                'post': self.random.randint(1, posts),
+                'author': self.random.randint(1, self.sizes['users']),
+                'text': self.random.choice(self.texts),
+                'created': self._date(),
+            }}
+
+    def follows(self):
+        users = self.sizes['users']
+        edges = set()
+        retry = False
+        while len(edges) < self.sizes['follows']:
+            user = self.random.randint(1, users)
+            # После повтора автор берётся равномерно, иначе на плотном
+            # графе популярные пары выпадали бы снова и снова.
+            if retry:
+                author = self.random.randint(1, users)
+            else:
+                author = self._author()
+            retry = user == author or (user, author) in edges
+            if retry:
+                continue
+            edges.add((user, author))
+            yield {'model': 'posts.follow', 'pk': len(edges), 'fields': {
+                'user': user, 'author': author,
+            }}
+
+    def objects(self):
+        return itertools.chain(
+            self.users(), self.groups(), self.posts(), self.comments(),
+            self.follows(),
+        )
+
+    def write(self, path) -> int:
+        """Пишет фикстуру (.json, .json.gz, ...), возвращает число объектов.
+        """
+        opener = OPENERS.get(os.path.splitext(path)[1], open)
+        count = 0
+        with opener(path, 'wt', encoding='utf-8') as file:
+            file.write('[')
+            objects = self.objects()
+            chunks = iter(lambda: list(
+                itertools.islice(objects, WRITE_CHUNK)
+            ), [])
+            for chunk in chunks:
+                file.write(',\n' if count else '')
+                file.write(',\n'.join(
+                    json.dumps(obj, ensure_ascii=False) for obj in chunk
+                ))
+                count += len(chunk)
+            file.write(']\n')
+        return count
@@ -0,0 +1,45 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from benchmarks import scenarios
+
+
+class Command(BaseCommand):
+    help = 'Сравнивает два отчёта run_benchmarks (например, двух коммитов)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('old')
+        parser.add_argument('new')
+        parser.add_argument(
+            '--threshold', type=float, default=10.0,
+            help='Допустимый рост p95, %%',
+        )
+        parser.add_argument(
+            '--fail', action='store_true',
+            help='Завершиться с ошибкой, если есть ухудшения',
+        )
+
+    def handle(self, *args, **options):
+        reports = []
+        for path in (options['old'], options['new']):
+            with open(path, encoding='utf-8') as file:
+                reports.append(json.load(file))
+        old, new = reports
+        self.stdout.write(
+            f'{old["meta"].get("commit")} -> {new["meta"].get("commit")}'
+        )
+        rows, regressions = scenarios.compare(
+            old, new, options['threshold']
+        )
+        for row in rows:
+            mark = '!' if row['scenario'] in regressions else ' '
+            self.stdout.write(f'{mark} {row["scenario"]:<36}' + ''.join(
+                f'{metric} {before:>7} -> {after:>7} ({change:+.0f}%)  '
+                for metric, (before, after, change) in (
+                    (metric, row[metric])
+                    for metric in ('p50', 'p95', 'p99', 'queries')
+                )
+            ))
+        if regressions and options['fail']:
+            raise CommandError(f'Ухудшились: {", ".join(regressions)}')
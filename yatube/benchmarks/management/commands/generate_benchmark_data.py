@@ -0,0 +1,35 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from benchmarks.generator import DataGenerator
+
+
+class Command(BaseCommand):
+    help = ('Пишет синтетические данные в формате dump.json; '
+            'загрузка: manage.py bulkload <файл>')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл .json, .json.gz, .json.xz')
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--groups', type=int, default=20)
+        parser.add_argument('--posts', type=int, default=10000)
+        parser.add_argument('--comments', type=int, default=30000)
+        parser.add_argument('--follows', type=int, default=20000)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        generator = DataGenerator(
+            users=options['users'],
+            groups=options['groups'],
+            posts=options['posts'],
+            comments=options['comments'],
+            follows=options['follows'],
+            seed=options['seed'],
+        )
+        count = generator.write(options['path'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Записано {count} объектов за '
+            f'{time.perf_counter() - start:.1f} с'
+        ))
@@ -0,0 +1,111 @@
+import json
+import platform
+import subprocess
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+from django.utils import timezone
+
+from benchmarks import scenarios
+
+
+def current_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = ('Гоняет сценарии по маршрутам posts.urls и пишет JSON-отчёт '
+            'с p50/p95/p99 и числом запросов; см. compare_benchmarks')
+
+    def add_arguments(self, parser):
+        parser.add_argument('-o', '--output', default='benchmark.json')
+        parser.add_argument(
+            '--transport', action='append',
+            choices=sorted(scenarios.TRANSPORTS),
+            help='client (по умолчанию), wsgi и/или asgi',
+        )
+        parser.add_argument('-n', '--iterations', type=int, default=50)
+        parser.add_argument(
+            '-c', '--concurrency', type=int, default=1,
+            help='Одновременных запросов (для транспортов wsgi и asgi)',
+        )
+        parser.add_argument('--warmup', type=int, default=3)
+        parser.add_argument(
+            '--clear-cache', action='store_true',
+            help='Очищать кэш перед каждым запросом (холодный старт)',
+        )
+        parser.add_argument(
+            '--debug', action='store_true',
+            help='Не выключать DEBUG (debug toolbar, connection.queries)',
+        )
+        parser.add_argument(
+            '-k', '--only', action='append', default=[],
+            help='Только сценарии, в имени которых есть подстрока',
+        )
+
+    def handle(self, *args, **options):
+        built = scenarios.build_scenarios()
+        if built is None:
+            raise CommandError(
+                'В базе нет данных: generate_benchmark_data, затем bulkload'
+            )
+        viewer, selected = built
+        if options['only']:
+            selected = [
+                scenario for scenario in selected
+                if any(part in scenario.name for part in options['only'])
+            ]
+        report = {
+            'meta': {
+                'commit': current_commit(),
+                'created': timezone.now().isoformat(),
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'database': settings.DATABASES['default']['ENGINE'],
+                'cache': settings.CACHES['default']['BACKEND'],
+                'iterations': options['iterations'],
+                'concurrency': options['concurrency'],
+                'asgi_threads': settings.ASGI_THREADS,
+                'clear_cache': options['clear_cache'],
+                'dataset': scenarios.dataset_size(),
+            },
+            'scenarios': {},
+        }
+        with override_settings(DEBUG=options['debug']):
+            for name in options['transport'] or ['client']:
+                self.run_transport(name, viewer, selected, report, options)
+        report['meta']['debug'] = options['debug']
+        with open(options['output'], 'w', encoding='utf-8') as file:
+            json.dump(report, file, ensure_ascii=False, indent=2)
+        self.stdout.write(self.style.SUCCESS(
+            f'Отчёт: {options["output"]}'
+        ))
+
+    def run_transport(self, name, viewer, selected, report, options):
+        transport = scenarios.TRANSPORTS[name](viewer)
+        try:
+            for scenario in selected:
+                result = scenarios.run_scenario(
+                    transport, scenario, options['iterations'],
+                    warmup=options['warmup'],
+                    clear_cache=options['clear_cache'],
+                    concurrency=options['concurrency'],
+                )
+                key = f'{name} {scenario.name}'
+                report['scenarios'][key] = result
+                self.stdout.write(
+                    f'{key:<36}'
+                    f'p50 {result["p50"]:>8} p95 {result["p95"]:>8} '
+                    f'p99 {result["p99"]:>8} ms {result["rps"]:>8} rps  '
+                    f'{result["queries"]:>5} запросов'
+                )
+        finally:
+            transport.close()
@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import (setup_test_environment,
+                               teardown_test_environment)
+
+from benchmarks import budget
+
+
+class Command(BaseCommand):
+    help = ('Пересчитывает бюджет SQL-запросов маршрутов во временной '
+            'тестовой базе и записывает benchmarks/query_budget.json')
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            budget.load_dataset()
+            results = budget.measure()
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+        previous = {}
+        try:
+            previous = budget.load()
+        except FileNotFoundError:
+            pass
+        for key, actual in sorted(results.items()):
+            before = previous.get(key, {}).get('queries')
+            if before != actual['queries']:
+                self.stdout.write(
+                    f'{key:<48}{before} -> {actual["queries"]}'
+                )
+        budget.save(results)
+        self.stdout.write(self.style.SUCCESS(
+            f'Бюджет записан: {budget.BUDGET_FILE}'
+        ))
@@ -0,0 +1,381 @@
+"""Сценарии нагрузки на маршруты posts.urls.
+
+Каждый сценарий — один URL, который запрашивается много раз через
+тестовый клиент Django или через настоящий WSGI-сервер (wsgiref).
+Число SQL-запросов берётся из заголовка Server-Timing, который выставляет
+core.middleware.RequestMetricsMiddleware. С concurrency > 1 запросы
+идут параллельно: и WSGI-сервер, и ASGI-транспорт обслуживают их пулом
+из ASGI_THREADS потоков, поэтому сравнение честное.
+"""
+import asyncio
+import http.client
+import math
+import re
+import secrets
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode
+from wsgiref.simple_server import (
+    WSGIRequestHandler, WSGIServer, make_server,
+)
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.wsgi import get_wsgi_application
+from django.db.models import Count
+from django.test import Client
+from django.urls import reverse
+
+from core.asgi import ASGIHandler
+from posts.models import Comment, Follow, Group, Post, User
+
+HOST = '127.0.0.1'
+QUERIES_RE = re.compile(r'"(\d+) queries"')
+
+
+class Scenario:
+    def __init__(self, name, url, method='GET', data=None, auth=False):
+        self.name = name
+        self.url = url
+        self.method = method
+        self.data = data
+        self.auth = auth
+
+
+def _top(queryset, field):
+    return queryset.annotate(
+        number=Count(field)
+    ).order_by('-number', 'pk').first()
+
+
+def pick_objects():
+    """Самые нагруженные объекты базы или None, если данных нет.
+
+    Смотрящий — пользователь с наибольшим числом подписок: так лента
+    подписок и кнопки подписки получают худший случай.
+    """
+    viewer = _top(User.objects.all(), 'follower')
+    author = _top(User.objects.exclude(pk=getattr(viewer, 'pk', None)),
+                  'posts')
+    post = Post.objects.order_by('-comments_count', '-pk').first()
+    if viewer is None or author is None or post is None:
+        return None
+    return {
+        'viewer': viewer,
+        'author': author,
+        'group': _top(Group.objects.all(), 'posts'),
+        'post': post,
+        'own_post': viewer.posts.order_by('-pk').first(),
+    }
+
+
+def build_scenarios():
+    """Смотрящий и сценарии по объектам из pick_objects() или None."""
+    objects = pick_objects()
+    if objects is None:
+        return None
+    viewer, author, group, post = (
+        objects['viewer'], objects['author'], objects['group'],
+        objects['post'],
+    )
+    word = post.text.split()[0].strip('.,!?') if post.text else 'пост'
+    scenarios = [
+        Scenario('index', reverse('posts:index')),
+        Scenario('index?page=5', reverse('posts:index') + '?page=5'),
+        Scenario('profile',
+                 reverse('posts:profile', args=(author.username,))),
+        Scenario('post_detail',
+                 reverse('posts:post_detail', args=(post.pk,))),
+        Scenario('post_comments',
+                 reverse('posts:post_comments', args=(post.pk,))),
+        Scenario('search',
+                 reverse('posts:search') + '?' + urlencode({'q': word})),
+        Scenario('index [auth]', reverse('posts:index'), auth=True),
+        Scenario('post_detail [auth]',
+                 reverse('posts:post_detail', args=(post.pk,)), auth=True),
+        Scenario('follow_index [auth]', reverse('posts:follow_index'),
+                 auth=True),
+        Scenario('post_create [auth]', reverse('posts:post_create'),
+                 auth=True),
+        Scenario('add_comment [auth]',
+                 reverse('posts:add_comment', args=(post.pk,)),
+                 method='POST', data={'text': 'Нагрузочный комментарий'},
+                 auth=True),
+        Scenario('profile_follow [auth]',
+                 reverse('posts:profile_follow', args=(author.username,)),
+                 auth=True),
+        Scenario('profile_unfollow [auth]',
+                 reverse('posts:profile_unfollow', args=(author.username,)),
+                 auth=True),
+    ]
+    if group is not None:
+        scenarios.append(Scenario(
+            'group_list', reverse('posts:group_list', args=(group.slug,))
+        ))
+    if objects['own_post'] is not None:
+        scenarios.append(Scenario(
+            'post_edit [auth]',
+            reverse('posts:post_edit', args=(objects['own_post'].pk,)),
+            auth=True,
+        ))
+    return viewer, scenarios
+
+
+def _queries(server_timing) -> int:
+    found = QUERIES_RE.search(server_timing or '')
+    return int(found.group(1)) if found else 0
+
+
+class ClientTransport:
+    """Запросы через django.test.Client, без сети."""
+
+    name = 'client'
+
+    def __init__(self, viewer):
+        self.anonymous = Client(HTTP_HOST=HOST)
+        self.authorized = Client(HTTP_HOST=HOST)
+        self.authorized.force_login(viewer)
+
+    def request(self, scenario):
+        client = self.authorized if scenario.auth else self.anonymous
+        if scenario.method == 'POST':
+            response = client.post(scenario.url, scenario.data)
+        else:
+            response = client.get(scenario.url)
+        response.close()
+        return response.status_code, _queries(response.get('Server-Timing'))
+
+    def close(self):
+        pass
+
+
+class _QuietHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+class _PooledWSGIServer(WSGIServer):
+    """wsgiref-сервер с пулом из ASGI_THREADS потоков, как у ASGIHandler."""
+
+    request_queue_size = 128
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.executor = ThreadPoolExecutor(
+            settings.ASGI_THREADS, thread_name_prefix='wsgi'
+        )
+
+    def process_request(self, request, client_address):
+        self.executor.submit(self.process_in_thread, request, client_address)
+
+    def process_in_thread(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def server_close(self):
+        super().server_close()
+        self.executor.shutdown()
+
+
+class CookieTransport:
+    """Сессия смотрящего в заголовках, как у настоящего браузера."""
+
+    def __init__(self, viewer):
+        client = Client()
+        client.force_login(viewer)
+        session = client.cookies[settings.SESSION_COOKIE_NAME].value
+        self.csrf_token = secrets.token_hex(16)
+        self.cookies = (
+            f'{settings.SESSION_COOKIE_NAME}={session}; '
+            f'{settings.CSRF_COOKIE_NAME}={self.csrf_token}'
+        )
+
+    def headers(self, scenario):
+        headers = {'Host': HOST}
+        body = b''
+        if scenario.auth:
+            headers['Cookie'] = self.cookies
+        if scenario.method == 'POST':
+            body = urlencode(scenario.data).encode()
+            headers['Content-Type'] = 'application/x-www-form-urlencoded'
+            headers['X-CSRFToken'] = self.csrf_token
+        return headers, body
+
+
+class WSGITransport(CookieTransport):
+    """Запросы по HTTP к многопоточному wsgiref-серверу."""
+
+    name = 'wsgi'
+
+    def __init__(self, viewer):
+        super().__init__(viewer)
+        self.server = make_server(
+            HOST, 0, get_wsgi_application(),
+            server_class=_PooledWSGIServer, handler_class=_QuietHandler,
+        )
+        self.thread = threading.Thread(
+            target=self.server.serve_forever, daemon=True
+        )
+        self.thread.start()
+
+    def request(self, scenario):
+        connection = http.client.HTTPConnection(
+            HOST, self.server.server_port
+        )
+        headers, body = self.headers(scenario)
+        try:
+            connection.request(scenario.method, scenario.url, body, headers)
+            response = connection.getresponse()
+            response.read()
+            return response.status, _queries(
+                response.getheader('Server-Timing')
+            )
+        finally:
+            connection.close()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class ASGITransport(CookieTransport):
+    """Запросы к core.asgi.ASGIHandler в событийном цикле без сети."""
+
+    name = 'asgi'
+
+    def __init__(self, viewer):
+        super().__init__(viewer)
+        self.application = ASGIHandler(WSGIHandler())
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(
+            target=self.loop.run_forever, daemon=True
+        )
+        self.thread.start()
+
+    async def call(self, scenario, headers, body):
+        path, _, query = scenario.url.partition('?')
+        scope = {
+            'type': 'http', 'http_version': '1.1',
+            'method': scenario.method, 'scheme': 'http',
+            'path': path, 'query_string': query.encode(),
+            'headers': [
+                (name.lower().encode(), value.encode())
+                for name, value in headers.items()
+            ],
+            'server': (HOST, 80), 'client': (HOST, 0),
+        }
+        messages = iter([{'type': 'http.request', 'body': body}])
+        response = {}
+
+        async def receive():
+            return next(messages, {'type': 'http.disconnect'})
+
+        async def send(message):
+            if message['type'] == 'http.response.start':
+                response.update(message)
+
+        await self.application(scope, receive, send)
+        return response
+
+    def request(self, scenario):
+        headers, body = self.headers(scenario)
+        response = asyncio.run_coroutine_threadsafe(
+            self.call(scenario, headers, body), self.loop
+        ).result()
+        server_timing = dict(response['headers']).get(b'server-timing', b'')
+        return response['status'], _queries(server_timing.decode())
+
+    def close(self):
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.loop.close()
+        self.application.executor.shutdown()
+
+
+TRANSPORTS = {
+    ClientTransport.name: ClientTransport,
+    WSGITransport.name: WSGITransport,
+    ASGITransport.name: ASGITransport,
+}
+
+
+def percentile(samples, q):
+    """Перцентиль по рангу (nearest-rank) для отсортированной выборки."""
+    if not samples:
+        return 0.0
+    return samples[max(math.ceil(q / 100 * len(samples)) - 1, 0)]
+
+
+def _timed(transport, scenario, clear_cache):
+    if clear_cache:
+        cache.clear()
+    start = time.perf_counter()
+    status, query_count = transport.request(scenario)
+    return (time.perf_counter() - start) * 1000, status, query_count
+
+
+def run_scenario(transport, scenario, iterations, warmup=3,
+                 clear_cache=False, concurrency=1):
+    for _ in range(warmup):
+        _timed(transport, scenario, clear_cache)
+    start = time.perf_counter()
+    if concurrency > 1:
+        with ThreadPoolExecutor(concurrency) as executor:
+            results = list(executor.map(
+                lambda _: _timed(transport, scenario, clear_cache),
+                range(iterations),
+            ))
+    else:
+        results = [_timed(transport, scenario, clear_cache)
+                   for _ in range(iterations)]
+    elapsed = time.perf_counter() - start
+    timings = sorted(timing for timing, _, _ in results)
+    queries = [query_count for _, _, query_count in results]
+    return {
+        'method': scenario.method,
+        'url': scenario.url,
+        'requests': iterations,
+        'concurrency': concurrency,
+        'errors': sum(status >= 400 for _, status, _ in results),
+        'p50': round(percentile(timings, 50), 2),
+        'p95': round(percentile(timings, 95), 2),
+        'p99': round(percentile(timings, 99), 2),
+        'mean': round(sum(timings) / len(timings), 2) if timings else 0.0,
+        'rps': round(iterations / elapsed, 1) if elapsed else 0.0,
+        'queries': round(sum(queries) / len(queries), 1) if queries else 0,
+    }
+
+
+def dataset_size() -> dict:
+    return {
+        'users': User.objects.count(),
+        'groups': Group.objects.count(),
+        'posts': Post.objects.count(),
+        'comments': Comment.objects.count(),
+        'follows': Follow.objects.count(),
+    }
+
+
+def compare(old, new, threshold=10.0):
+    """Строки сравнения двух отчётов и список ухудшившихся сценариев."""
+    rows = []
+    regressions = []
+    for name, current in new['scenarios'].items():
+        previous = old['scenarios'].get(name)
+        if previous is None:
+            continue
+        row = {'scenario': name}
+        for metric in ('p50', 'p95', 'p99', 'queries'):
+            before, after = previous[metric], current[metric]
+            change = (after - before) / before * 100 if before else 0.0
+            row[metric] = (before, after, change)
+        rows.append(row)
+        if row['p95'][2] > threshold or row['queries'][2] > 0:
+            regressions.append(name)
+    return rows, regressions
@@ -0,0 +1,98 @@
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db.models import F
+from django.test import TestCase
+from django.urls import resolve
+
+from benchmarks import budget
+from benchmarks.generator import DataGenerator
+from posts.models import Comment, Follow, Post
+from posts.urls import urlpatterns
+
+
+class BenchmarkTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.directory = tempfile.mkdtemp()
+        self.fixture = os.path.join(self.directory, 'data.json.gz')
+        DataGenerator(
+            users=20, groups=3, posts=60, comments=80, follows=50, seed=1
+        ).write(self.fixture)
+        call_command('bulkload', self.fixture, stdout=StringIO())
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def path(self, name):
+        return os.path.join(self.directory, name)
+
+    def test_generated_data_loads(self):
+        """Сгенерированная фикстура загружается командой bulkload"""
+        self.assertEqual(Post.objects.count(), 60)
+        self.assertEqual(Comment.objects.count(), 80)
+        self.assertEqual(Follow.objects.count(), 50)
+        self.assertFalse(
+            Follow.objects.filter(user_id=F('author_id')).exists()
+        )
+
+    def test_report_covers_every_route(self):
+        """Отчёт содержит перцентили для каждого маршрута posts.urls"""
+        call_command(
+            'run_benchmarks', '-o', self.path('report.json'), '-n', '3',
+            '--warmup', '0', stdout=StringIO(),
+        )
+        with open(self.path('report.json')) as file:
+            report = json.load(file)
+        self.assertEqual(report['meta']['dataset']['posts'], 60)
+        routes = set()
+        for result in report['scenarios'].values():
+            self.assertEqual(result['errors'], 0, result['url'])
+            self.assertLessEqual(result['p50'], result['p99'])
+            routes.add(resolve(result['url'].split('?')[0]).url_name)
+        self.assertEqual(routes, {pattern.name for pattern in urlpatterns})
+
+    def test_compare_reports_regressions(self):
+        """Сравнение отчётов находит выросший p95 и число запросов"""
+        scenario = {'p50': 1.0, 'p95': 2.0, 'p99': 3.0, 'queries': 2.0}
+        old = {'meta': {'commit': 'a'}, 'scenarios': {'client index': {
+            **scenario
+        }}}
+        new = {'meta': {'commit': 'b'}, 'scenarios': {'client index': {
+            **scenario, 'queries': 3.0
+        }}}
+        for name, report in (('old.json', old), ('new.json', new)):
+            with open(self.path(name), 'w') as file:
+                json.dump(report, file)
+        out = StringIO()
+        call_command(
+            'compare_benchmarks', self.path('old.json'),
+            self.path('old.json'), '--fail', stdout=out,
+        )
+        self.assertIn('a -> a', out.getvalue())
+        with self.assertRaises(CommandError):
+            call_command(
+                'compare_benchmarks', self.path('old.json'),
+                self.path('new.json'), '--fail', stdout=StringIO(),
+            )
+
+
+class QueryBudgetTests(TestCase):
+    # Сам бюджет проверяет tests/test_query_budget.py, его запускает CI.
+    def test_check_reports_regressions(self):
+        """Лишний запрос, медленный SQL и новый маршрут — ошибки"""
+        allowed = {'posts:index anonymous': {'queries': 2, 'sql_ms': 1.0}}
+        self.assertEqual(budget.check({'posts:index anonymous': {
+            'queries': 2, 'sql_ms': 5.0,
+        }}, allowed), [])
+        problems = budget.check({
+            'posts:index anonymous': {'queries': 3, 'sql_ms': 100.0},
+            'posts:new anonymous': {'queries': 1, 'sql_ms': 0.0},
+        }, allowed)
+        self.assertEqual(len(problems), 3)
@@ -0,0 +1,41 @@
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.core.mail.backends.base import BaseEmailBackend
+
+from core import jobs
+
+FIELDS = ('subject', 'body', 'from_email', 'to', 'cc', 'bcc', 'reply_to',
+          'alternatives')
+
+
+@jobs.task
+def send_email(message):
+    email = EmailMultiAlternatives(**message)
+    with get_connection(settings.JOBS_EMAIL_BACKEND) as connection:
+        connection.send_messages([email])
+
+
+class QueuedEmailBackend(BaseEmailBackend):
+    """Отправляет письма фоновой задачей через JOBS_EMAIL_BACKEND.
+
+    Письма с вложениями отправляются сразу: вложения не хранятся
+    в очереди.
+    """
+
+    def send_messages(self, email_messages):
+        inline = []
+        for message in email_messages:
+            if message.attachments:
+                inline.append(message)
+                continue
+            fields = {field: getattr(message, field, [])
+                      for field in FIELDS}
+            jobs.enqueue(send_email, dict(
+                fields, headers=message.extra_headers
+            ))
+        if inline:
+            with get_connection(
+                settings.JOBS_EMAIL_BACKEND, fail_silently=self.fail_silently
+            ) as connection:
+                connection.send_messages(inline)
+        return len(email_messages)
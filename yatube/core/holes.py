@@ -0,0 +1,42 @@
+"""Личные фрагменты в общих для всех пользователей страницах.
+
+Шаблон помечает зависящие от пользователя места тегом
+{% hole 'шаблон' параметр=значение %}. Обычно тег просто рендерит
+фрагмент на месте, как include. Если страница авторизованного
+пользователя идёт в кэш (core/page_cache.py), тег оставляет вместо
+фрагмента метку, и в кэш ложится заготовка, одинаковая для всех; метки
+заполняются для каждого запроса уже после чтения из кэша. Фрагмент
+видит только свои параметры и данные context processors (user,
+request, csrf_token), поэтому оба пути дают один и тот же HTML.
+Параметры должны сериализоваться в JSON.
+"""
+import base64
+import json
+import re
+
+from django.template.loader import render_to_string
+
+HOLE = '<!--hole:{}-->'
+HOLE_RE = re.compile(rb'<!--hole:([\w=-]+)-->')
+
+
+def punching(request) -> bool:
+    return getattr(request, 'punch_holes', False)
+
+
+def placeholder(template_name, params) -> str:
+    payload = json.dumps([template_name, params], sort_keys=True)
+    return HOLE.format(base64.urlsafe_b64encode(payload.encode()).decode())
+
+
+def fill(request, content) -> bytes:
+    """Заменяет метки в content фрагментами для request."""
+    def render(match):
+        template_name, params = json.loads(
+            base64.urlsafe_b64decode(match.group(1))
+        )
+        return render_to_string(
+            template_name, params, request=request
+        ).encode()
+
+    return HOLE_RE.sub(render, content)
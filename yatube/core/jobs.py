@@ -0,0 +1,121 @@
+"""Очередь фоновых задач в таблице core.Job.
+
+View ставят медленные побочные эффекты записи (письма, миниатюры) в
+очередь и сразу отвечают; раскладка постов по лентам остаётся
+синхронной (posts/timeline.py). manage.py run_jobs выполняет задачи
+пулом потоков. Строка задачи пишется в той же транзакции, что и данные,
+поэтому воркер не увидит задачу, запись которой откатилась. Задача
+захватывается условным UPDATE: несколько воркеров не возьмут её
+одновременно, а задача умершего воркера снова становится доступна после
+JOBS_VISIBILITY_TIMEOUT. Упавшая задача повторяется с растущей паузой.
+Доставка «хотя бы один раз», поэтому задачи должны быть идемпотентны.
+Брокер не нужен, хватает SQLite.
+"""
+import json
+import logging
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+
+def task(func):
+    """Разрешает ставить функцию в очередь: enqueue(func, ...)."""
+    func.task_name = f'{func.__module__}.{func.__qualname__}'
+    return func
+
+
+def enqueue(func, *args, delay=0, **kwargs):
+    """Ставит задачу в очередь.
+
+    При JOBS_EAGER задача выполняется в этом же процессе после коммита
+    текущей транзакции.
+    """
+    if settings.JOBS_EAGER:
+        transaction.on_commit(lambda: func(*args, **kwargs))
+        return None
+    return Job.objects.create(
+        name=func.task_name,
+        payload=json.dumps({'args': args, 'kwargs': kwargs}),
+        max_attempts=settings.JOBS_MAX_ATTEMPTS,
+        run_after=timezone.now() + timedelta(seconds=delay),
+    )
+
+
+def _available(now):
+    return (
+        Q(status=Job.QUEUED, run_after__lte=now)
+        | Q(status=Job.RUNNING, locked_until__lt=now)
+    )
+
+
+def claim(limit) -> list:
+    """Захватывает до limit готовых задач."""
+    now = timezone.now()
+    candidates = Job.objects.filter(_available(now)).order_by(
+        'run_after', 'pk'
+    ).values_list('pk', flat=True)[:limit]
+    claimed = [
+        pk for pk in candidates
+        if Job.objects.filter(_available(now), pk=pk).update(
+            status=Job.RUNNING,
+            attempts=F('attempts') + 1,
+            locked_until=now + timedelta(
+                seconds=settings.JOBS_VISIBILITY_TIMEOUT
+            ),
+        )
+    ]
+    return list(Job.objects.filter(pk__in=claimed).order_by('run_after'))
+
+
+def _finish(job, **fields):
+    Job.objects.filter(pk=job.pk).update(locked_until=None, **fields)
+
+
+def run(job):
+    now = timezone.now()
+    if job.attempts > job.max_attempts:
+        # Воркер, захвативший задачу последним, не успел её завершить.
+        _finish(job, status=Job.FAILED, finished=now,
+                last_error='Истекло время выполнения')
+        return
+    try:
+        func = import_string(job.name)
+        if getattr(func, 'task_name', None) != job.name:
+            raise ImportError(f'{job.name} не помечена как задача')
+        payload = json.loads(job.payload)
+        func(*payload['args'], **payload['kwargs'])
+    except Exception:
+        logger.exception('Задача %s упала', job)
+        error = traceback.format_exc()
+        if job.attempts < job.max_attempts:
+            delay = settings.JOBS_RETRY_DELAY * 2 ** (job.attempts - 1)
+            _finish(job, status=Job.QUEUED, last_error=error,
+                    run_after=now + timedelta(seconds=delay))
+        else:
+            _finish(job, status=Job.FAILED, last_error=error, finished=now)
+    else:
+        _finish(job, status=Job.DONE, finished=timezone.now())
+
+
+def run_in_thread(job):
+    try:
+        run(job)
+    finally:
+        close_old_connections()
+
+
+def purge(days) -> int:
+    """Удаляет выполненные задачи старше days дней."""
+    deleted, _ = Job.objects.filter(
+        status=Job.DONE, finished__lt=timezone.now() - timedelta(days=days)
+    ).delete()
+    return deleted
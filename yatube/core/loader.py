@@ -0,0 +1,297 @@
+"""Быстрая загрузка фикстур в формате dumpdata.
+
+Файл читается кусками и разбирается потоково, строки копятся по моделям
+и вставляются пачками (executemany) в порядке зависимостей внешних
+ключей. Сигналы моделей не отправляются: после загрузки рассылается
+core.signals.bulk_loaded, по которому приложения пересобирают
+производные данные.
+"""
+import bz2
+import gzip
+import json
+import lzma
+import time
+from collections import defaultdict
+
+from django.apps import apps
+from django.core import serializers
+from django.core.management.color import no_style
+from django.core.serializers.base import DeserializationError
+from django.db import connections, transaction
+
+from .signals import bulk_loaded
+
+CHUNK_SIZE: int = 1 << 16
+BATCH_SIZE: int = 5000
+
+OPENERS = {
+    '.gz': gzip.open,
+    '.bz2': bz2.open,
+    '.xz': lzma.open,
+    '.lzma': lzma.open,
+}
+
+
+def open_fixture(path):
+    for suffix, opener in OPENERS.items():
+        if path.endswith(suffix):
+            return opener(path, 'rt', encoding='utf-8')
+    return open(path, encoding='utf-8')
+
+
+def _skip_separators(buffer, position, started):
+    while position < len(buffer):
+        char = buffer[position]
+        if char == '[' and not started:
+            started = True
+        elif not (char.isspace() or char == ','):
+            break
+        position += 1
+    return position, started
+
+
+def iter_objects(stream, chunk_size=CHUNK_SIZE):
+    """Элементы JSON-массива верхнего уровня по одному."""
+    decoder = json.JSONDecoder()
+    buffer = ''
+    position = 0
+    started = eof = False
+    while True:
+        position, started = _skip_separators(buffer, position, started)
+        if position < len(buffer):
+            if buffer[position] == ']':
+                return
+            if not started:
+                raise DeserializationError('Ожидался JSON-массив')
+            try:
+                item, position = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+            else:
+                yield item
+                continue
+        if eof:
+            raise DeserializationError('Неожиданный конец файла')
+        chunk = stream.read(chunk_size)
+        eof = not chunk
+        buffer = buffer[position:] + chunk
+        position = 0
+
+
+def dependency_order(models):
+    """Модели так, что цели внешних ключей идут раньше ссылающихся."""
+    models = list(models)
+    ordered = []
+    visiting = set()
+
+    def visit(model):
+        if model in ordered or model in visiting:
+            return
+        visiting.add(model)
+        for field in model._meta.concrete_fields:
+            target = field.related_model if field.is_relation else None
+            if target is not None and target in models and target != model:
+                visit(target)
+        visiting.discard(model)
+        ordered.append(model)
+
+    for model in models:
+        visit(model)
+    return ordered
+
+
+class NeedsDeserializer(Exception):
+    """Строку нельзя разобрать напрямую (например, natural keys)."""
+
+
+class Table:
+    """Подготовленная вставка строк одной модели."""
+
+    def __init__(self, model, connection, ignore_conflicts):
+        self.model = model
+        self.connection = connection
+        opts = model._meta
+        self.fields = opts.concrete_fields
+        self.pk_index = self.fields.index(opts.pk)
+        self.m2m = {
+            field.name: field for field in opts.many_to_many
+            if field.remote_field.through._meta.auto_created
+        }
+        self.statements = {
+            with_pk: self._statement(with_pk, ignore_conflicts)
+            for with_pk in (True, False)
+        }
+        self.rows = {True: [], False: []}
+
+    def _statement(self, with_pk, ignore_conflicts):
+        ops = self.connection.ops
+        columns = [
+            ops.quote_name(field.column) for field in self.fields
+            if with_pk or not field.primary_key
+        ]
+        return (
+            f'{ops.insert_statement(ignore_conflicts=ignore_conflicts)} '
+            f'{ops.quote_name(self.model._meta.db_table)} '
+            f'({", ".join(columns)}) '
+            f'VALUES ({", ".join(["%s"] * len(columns))}) '
+            f'{ops.ignore_conflicts_suffix_sql(ignore_conflicts)}'
+        ).rstrip()
+
+    def __len__(self):
+        return len(self.rows[True]) + len(self.rows[False])
+
+    def row(self, pk, data):
+        """Значения для БД из словаря fields фикстуры."""
+        values = []
+        for field in self.fields:
+            if field.primary_key:
+                if pk is None:
+                    continue
+                value = field.to_python(pk)
+            elif field.name in data:
+                value = data[field.name]
+                if isinstance(value, (list, dict)) and field.is_relation:
+                    raise NeedsDeserializer
+                value = (field.target_field if field.is_relation
+                         else field).to_python(value)
+            else:
+                value = field.get_default()
+            values.append(field.get_db_prep_save(value, self.connection))
+        return values
+
+    def instance_row(self, obj):
+        return [
+            field.get_db_prep_save(getattr(obj, field.attname),
+                                   self.connection)
+            for field in self.fields
+            if obj.pk is not None or not field.primary_key
+        ]
+
+    def add(self, values, with_pk=True):
+        self.rows[with_pk].append(values)
+
+    def flush(self):
+        with self.connection.cursor() as cursor:
+            for with_pk, rows in self.rows.items():
+                if rows:
+                    cursor.executemany(self.statements[with_pk], rows)
+        count = len(self)
+        self.rows = {True: [], False: []}
+        return count
+
+
+class BulkLoader:
+    def __init__(self, using, batch_size=BATCH_SIZE, exclude=(),
+                 ignore_conflicts=False):
+        self.using = using
+        self.batch_size = batch_size
+        self.exclude = set(exclude)
+        self.ignore_conflicts = ignore_conflicts
+        self.connection = connections[using]
+        self.tables = {}
+        self.counts = defaultdict(int)
+        self.elapsed = 0.0
+
+    def excluded(self, model):
+        opts = model._meta
+        return bool({opts.app_label, opts.label_lower} & self.exclude)
+
+    def table(self, model):
+        if model not in self.tables:
+            self.tables[model] = Table(
+                model, self.connection, self.ignore_conflicts
+            )
+        return self.tables[model]
+
+    def flush(self, table):
+        self.counts[table.model] += table.flush()
+
+    def add(self, table, values, with_pk=True):
+        table.add(values, with_pk)
+        if len(table) >= self.batch_size:
+            self.flush(table)
+
+    def add_m2m(self, table, pk, name, values):
+        field = table.m2m[name]
+        through = self.table(field.remote_field.through)
+        target = field.target_field
+        for value in values:
+            if isinstance(value, (list, dict)):
+                raise NeedsDeserializer
+            self.add(through, [
+                pk, target.get_db_prep_save(target.to_python(value),
+                                            self.connection),
+            ], with_pk=False)
+
+    def add_object(self, item):
+        try:
+            model = apps.get_model(item['model'])
+        except (LookupError, ValueError):
+            return
+        if self.excluded(model):
+            return
+        table = self.table(model)
+        data = item.get('fields', {})
+        if item.get('pk') is None:
+            raise NeedsDeserializer
+        values = table.row(item['pk'], data)
+        pk = values[table.pk_index]
+        m2m = [(name, data[name]) for name in table.m2m if name in data]
+        for name, related in m2m:
+            if any(isinstance(value, (list, dict)) for value in related):
+                raise NeedsDeserializer
+        self.add(table, values)
+        for name, related in m2m:
+            self.add_m2m(table, pk, name, related)
+
+    def add_deserialized(self, item):
+        for deserialized in serializers.deserialize(
+            'python', [item], using=self.using, ignorenonexistent=True,
+        ):
+            obj = deserialized.object
+            if self.excluded(obj._meta.model):
+                continue
+            table = self.table(obj._meta.model)
+            self.add(table, table.instance_row(obj), obj.pk is not None)
+            for name, related in (deserialized.m2m_data or {}).items():
+                if name in table.m2m:
+                    self.add_m2m(table, obj.pk, name, related)
+
+    def load_stream(self, stream):
+        for item in iter_objects(stream):
+            try:
+                self.add_object(item)
+            except NeedsDeserializer:
+                self.add_deserialized(item)
+
+    def load(self, paths):
+        """Загружает файлы, возвращает {модель: число строк}."""
+        started = time.monotonic()
+        with transaction.atomic(using=self.using):
+            with self.connection.constraint_checks_disabled():
+                for path in paths:
+                    with open_fixture(path) as stream:
+                        self.load_stream(stream)
+                for model in dependency_order(self.tables):
+                    self.flush(self.tables[model])
+            models = [model for model, count in self.counts.items() if count]
+            self.connection.check_constraints(
+                table_names=[model._meta.db_table for model in models]
+            )
+            self.reset_sequences(models)
+        self.elapsed = time.monotonic() - started
+        if models:
+            bulk_loaded.send(
+                sender=self.__class__, models=models, using=self.using
+            )
+        return {model: self.counts[model] for model in models}
+
+    def reset_sequences(self, models):
+        statements = self.connection.ops.sequence_reset_sql(
+            no_style(), models
+        )
+        if statements:
+            with self.connection.cursor() as cursor:
+                for sql in statements:
+                    cursor.execute(sql)
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS
+
+from core.loader import BATCH_SIZE, BulkLoader
+
+
+class Command(BaseCommand):
+    help = ('Быстро загружает фикстуры dumpdata пачками, '
+            'без сигналов моделей')
+
+    def add_arguments(self, parser):
+        parser.add_argument('fixtures', nargs='+')
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+        parser.add_argument(
+            '-e', '--exclude', action='append', default=[],
+            help='Пропустить приложение или модель (app_label.ModelName)',
+        )
+        parser.add_argument(
+            '--ignore-conflicts', action='store_true',
+            help='Пропускать строки, которые уже есть в базе',
+        )
+
+    def handle(self, *args, **options):
+        loader = BulkLoader(
+            options['database'],
+            batch_size=options['batch_size'],
+            exclude=[label.lower() for label in options['exclude']],
+            ignore_conflicts=options['ignore_conflicts'],
+        )
+        counts = loader.load(options['fixtures'])
+        total = sum(counts.values())
+        elapsed = loader.elapsed or 1e-9
+        if options['verbosity'] > 1:
+            for model, count in counts.items():
+                self.stdout.write(f'{model._meta.label_lower:<32}{count:>10}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Загружено {total} строк за {elapsed:.2f} с '
+            f'({total / elapsed:.0f} строк/с)'
+        ))
@@ -0,0 +1,50 @@
+import json
+import shutil
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core import metrics
+
+
+class Command(BaseCommand):
+    help = 'Выводит гистограммы времени ответа по именам URL'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--json', action='store_true')
+        parser.add_argument(
+            '--reset', action='store_true',
+            help='Удалить накопленные данные после вывода',
+        )
+
+    def handle(self, *args, **options):
+        directory = settings.REQUEST_METRICS_DIR
+        merged = metrics.load(directory)
+        rows = []
+        for view_name, histograms in sorted(merged.items()):
+            total = histograms['total']
+            rows.append({
+                'view': view_name,
+                'requests': total.count,
+                'p50': total.percentile(50),
+                'p95': total.percentile(95),
+                'p99': total.percentile(99),
+                'queries': round(histograms['queries'].mean, 1),
+                'sql_ms': round(histograms['sql'].mean, 1),
+                'template_ms': round(histograms['template'].mean, 1),
+            })
+        if options['json']:
+            self.stdout.write(json.dumps(rows, indent=2))
+        else:
+            header = ('view', 'requests', 'p50', 'p95', 'p99', 'queries',
+                      'sql_ms', 'template_ms')
+            self.stdout.write(
+                f'{header[0]:<32}' + ''.join(f'{h:>12}' for h in header[1:])
+            )
+            for row in rows:
+                self.stdout.write(
+                    f'{row["view"]:<32}'
+                    + ''.join(f'{row[h]:>12}' for h in header[1:])
+                )
+        if options['reset']:
+            shutil.rmtree(directory, ignore_errors=True)
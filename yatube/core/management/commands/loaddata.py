@@ -0,0 +1,20 @@
+from django.core.management.commands import loaddata
+
+from core.signals import bulk_loaded
+
+
+class Command(loaddata.Command):
+    """Обычный loaddata, после которого пересобираются производные данные.
+
+    Сигналы моделей при загрузке фикстуры приходят с raw=True и
+    пропускаются, поэтому в конце, как и после bulkload, рассылается
+    bulk_loaded.
+    """
+
+    def loaddata(self, fixture_labels):
+        super().loaddata(fixture_labels)
+        if self.models:
+            bulk_loaded.send(
+                sender=self.__class__, models=list(self.models),
+                using=self.using,
+            )
@@ -0,0 +1,58 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core import jobs
+
+
+class Command(BaseCommand):
+    help = 'Выполняет фоновые задачи из таблицы core.Job'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=settings.JOBS_WORKERS,
+        )
+        parser.add_argument(
+            '--poll', type=float, default=1.0,
+            help='Пауза, когда очередь пуста, с',
+        )
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Выполнить готовые задачи и выйти',
+        )
+        parser.add_argument(
+            '--purge-days', type=int, default=7,
+            help='Удалять выполненные задачи старше N дней',
+        )
+
+    def handle(self, *args, **options):
+        jobs.purge(options['purge_days'])
+        workers = options['workers']
+        if workers > 1:
+            with ThreadPoolExecutor(
+                workers, thread_name_prefix='jobs'
+            ) as executor:
+                done = self.loop(
+                    lambda claimed: executor.map(jobs.run_in_thread, claimed),
+                    workers, options,
+                )
+        else:
+            # Один воркер выполняет задачи в основном потоке.
+            done = self.loop(
+                lambda claimed: map(jobs.run, claimed), 1, options
+            )
+        self.stdout.write(self.style.SUCCESS(f'Выполнено задач: {done}'))
+
+    def loop(self, run_all, limit, options) -> int:
+        done = 0
+        while True:
+            claimed = jobs.claim(limit)
+            if claimed:
+                list(run_all(claimed))
+                done += len(claimed)
+            elif options['once']:
+                return done
+            else:
+                time.sleep(options['poll'])
@@ -0,0 +1,169 @@
+"""Гистограммы времени ответа по именам URL.
+
+Каждый процесс копит гистограммы в памяти и периодически сбрасывает их
+в REQUEST_METRICS_DIR/<pid>.json; команда dump_request_metrics
+объединяет файлы всех процессов.
+"""
+import atexit
+import bisect
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+from django.conf import settings
+
+BUCKETS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+METRICS = ('total', 'sql', 'queries', 'template')
+FLUSH_INTERVAL: int = 10
+
+_local = threading.local()
+_lock = threading.RLock()
+_last_flush = time.monotonic()
+
+
+class Histogram:
+    def __init__(self, counts=None, count=0, total=0.0):
+        self.counts = list(counts or [0] * (len(BUCKETS) + 1))
+        self.count = count
+        self.total = total
+
+    def add(self, value):
+        self.counts[bisect.bisect_left(BUCKETS, value)] += 1
+        self.count += 1
+        self.total += value
+
+    def merge(self, other):
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        self.count += other.count
+        self.total += other.total
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+    def percentile(self, q):
+        """Верхняя граница корзины, в которую попадает q-й перцентиль."""
+        rank = q / 100 * self.count
+        seen = 0
+        for bound, count in zip(BUCKETS + (float('inf'),), self.counts):
+            seen += count
+            if count and seen >= rank:
+                return bound
+        return 0
+
+    def to_dict(self):
+        return {'counts': self.counts, 'count': self.count,
+                'total': self.total}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['counts'], data['count'], data['total'])
+
+
+_histograms = defaultdict(lambda: {name: Histogram() for name in METRICS})
+
+
+class RequestStats:
+    def __init__(self):
+        self.queries = 0
+        self.sql = 0.0
+        self.template = 0.0
+        self.template_depth = 0
+
+
+def start_request():
+    _local.stats = RequestStats()
+    return _local.stats
+
+
+def current():
+    return getattr(_local, 'stats', None)
+
+
+def end_request():
+    _local.stats = None
+
+
+@contextmanager
+def template_render():
+    """Учитывает время рендеринга только самого внешнего шаблона.
+
+    render_to_string внутри тегов и дыр страницы идёт во время внешнего
+    рендеринга, и его время уже входит во внешнее.
+    """
+    stats = current()
+    if stats is None:
+        yield
+        return
+    outermost = not stats.template_depth
+    if outermost:
+        start = time.perf_counter()
+    stats.template_depth += 1
+    try:
+        yield
+    finally:
+        stats.template_depth -= 1
+        if outermost:
+            stats.template += time.perf_counter() - start
+
+
+def record(view_name, values):
+    with _lock:
+        histograms = _histograms[view_name]
+        for name, value in values.items():
+            histograms[name].add(value)
+        if time.monotonic() - _last_flush > FLUSH_INTERVAL:
+            flush()
+
+
+def snapshot():
+    with _lock:
+        return {
+            view_name: {name: h.to_dict() for name, h in histograms.items()}
+            for view_name, histograms in _histograms.items()
+        }
+
+
+def flush():
+    # Под блокировкой: потоки не пишут файл процесса одновременно.
+    global _last_flush
+    with _lock:
+        _last_flush = time.monotonic()
+        directory = settings.REQUEST_METRICS_DIR
+        if not directory or not _histograms:
+            return
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f'{os.getpid()}.json')
+        descriptor, temp_path = tempfile.mkstemp(
+            dir=directory, suffix='.tmp'
+        )
+        try:
+            with os.fdopen(descriptor, 'w') as file:
+                json.dump(snapshot(), file)
+            os.replace(temp_path, path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+
+
+def load(directory):
+    """Объединённые гистограммы всех процессов."""
+    merged = defaultdict(lambda: {name: Histogram() for name in METRICS})
+    if not os.path.isdir(directory):
+        return merged
+    for filename in os.listdir(directory):
+        if not filename.endswith('.json'):
+            continue
+        with open(os.path.join(directory, filename)) as file:
+            data = json.load(file)
+        for view_name, histograms in data.items():
+            for name, histogram in histograms.items():
+                merged[view_name][name].merge(Histogram.from_dict(histogram))
+    return merged
+
+
+atexit.register(flush)
@@ -0,0 +1,109 @@
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+from . import holes, metrics, page_cache, routers
+
+
+class RequestMetricsMiddleware:
+    """Считает SQL-запросы, время SQL, шаблонов и всего запроса.
+
+    Значения отдаются в заголовке Server-Timing и копятся
+    в гистограммах по имени URL (posts:index, posts:profile...).
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        stats = metrics.start_request()
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(self.time_query)
+                    )
+                response = self.get_response(request)
+        finally:
+            metrics.end_request()
+        total = time.perf_counter() - start
+        match = request.resolver_match
+        view_name = match.view_name if match else 'unresolved'
+        metrics.record(view_name, {
+            'total': total * 1000,
+            'sql': stats.sql * 1000,
+            'queries': stats.queries,
+            'template': stats.template * 1000,
+        })
+        response['Server-Timing'] = ', '.join((
+            f'sql;dur={stats.sql * 1000:.1f};desc="{stats.queries} queries"',
+            f'template;dur={stats.template * 1000:.1f}',
+            f'total;dur={total * 1000:.1f}',
+        ))
+        return response
+
+    @staticmethod
+    def time_query(execute, sql, params, many, context):
+        stats = metrics.current()
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            if stats is not None:
+                stats.queries += 1
+                stats.sql += time.perf_counter() - start
+
+
+class PageCacheMiddleware:
+    """Отдаёт сохранённые страницы целиком.
+
+    Кэшируются только view, помеченные page_cache.cacheable_page;
+    повторный запрос с If-None-Match / If-Modified-Since получает 304.
+    Авторизованным пользователям страница собирается из общей заготовки
+    и личных фрагментов, см. core/holes.py.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not page_cache.is_cacheable_request(request):
+            return self.get_response(request)
+        request.punch_holes = request.user.is_authenticated
+        key = page_cache.page_key(request)
+        response = page_cache.lookup(request, key)
+        if response is None:
+            response = page_cache.store(
+                request, self.get_response(request), key
+            )
+        if holes.punching(request):
+            response = page_cache.fill(request, response)
+        return response
+
+
+class ReplicaRoutingMiddleware:
+    """Выбирает базу для чтений view, см. core/routers.py."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        try:
+            response = self.get_response(request)
+        finally:
+            routers.use(None)
+        if getattr(request, 'pins_primary', False):
+            routers.pin(request.user)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.pins_primary = getattr(view_func, 'pins_primary', False)
+        if (
+            settings.DATABASE_REPLICAS
+            and getattr(view_func, 'read_from_replica', False)
+            and not routers.is_pinned(request.user)
+        ):
+            routers.use(routers.choose_replica())
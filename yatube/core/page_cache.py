@@ -0,0 +1,236 @@
+"""Кэш целых страниц.
+
+Ответ view, помеченного cacheable_page, сохраняется целиком под
+ключом из пути и строки запроса. У каждого пути есть поколение:
+purge(path) увеличивает его, и все варианты страницы (?page=2, ...)
+перестают находиться в кэше; purge_all() сбрасывает все страницы.
+Страница, которая зависит от данных за пределами своего пути, может
+добавить их к ключу: cacheable_page(variant=...).
+
+Анонимная страница хранится готовой. Страница авторизованного
+пользователя хранится заготовкой, общей для всех пользователей:
+личные фрагменты в ней оставлены метками (core/holes.py), их заполняет
+fill() при каждом ответе, и по готовому HTML считается ETag.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.urls import Resolver404, resolve
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe, quote_etag
+from django.utils.module_loading import import_string
+
+from . import holes
+
+PAGE_KEY = 'page:{}:{}:{}'
+PATH_VERSION_KEY = 'page_version:{}'
+ALL_PAGES = 'page_version:all'
+SKIPPED_HEADERS = frozenset({
+    'set-cookie', 'server-timing', 'vary', 'etag', 'last-modified',
+})
+
+
+def cacheable_page(view=None, *, variant=None):
+    """variant(request, *args, **kwargs) возвращает строку, которая
+    входит в ключ страницы, например поколение связанной ленты.
+    """
+    def decorator(view):
+        view.cacheable_page = True
+        view.page_variant = variant
+        return view
+
+    if view is None:
+        return decorator
+    return decorator(view)
+
+
+def _digest(value) -> str:
+    return hashlib.md5(value.encode()).hexdigest()
+
+
+def _initial() -> int:
+    return int(time.time() * 1000)
+
+
+def _version_timeout() -> int:
+    # Поколение живёт не меньше страниц под ним. Истёкшее поколение
+    # начинается заново с текущего времени в миллисекундах, то есть
+    # больше прежнего, и старые страницы не находятся.
+    return max(
+        settings.ANONYMOUS_PAGE_CACHE_TIMEOUT,
+        settings.USER_PAGE_CACHE_TIMEOUT,
+    )
+
+
+def _versions(path) -> tuple:
+    keys = (PATH_VERSION_KEY.format(_digest(path)), ALL_PAGES)
+    found = cache.get_many(keys)
+    for key in keys:
+        if key not in found:
+            cache.add(key, _initial(), _version_timeout())
+            found[key] = cache.get(key)
+    return tuple(found[key] for key in keys)
+
+
+def _bump(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, _initial(), _version_timeout())
+
+
+def purge(*paths):
+    for path in set(paths):
+        _bump(PATH_VERSION_KEY.format(_digest(path)))
+
+
+def purge_all():
+    _bump(ALL_PAGES)
+
+
+def page_key(request) -> str:
+    # Ключ берётся до вызова view: если страницу сбросят во время
+    # рендеринга, устаревший ответ ляжет под уже ненужное поколение.
+    versions = list(map(str, _versions(request.path)))
+    match = request.page_match
+    if match.func.page_variant is not None:
+        versions.append(
+            match.func.page_variant(request, *match.args, **match.kwargs)
+        )
+    return PAGE_KEY.format(
+        'user' if request.user.is_authenticated else 'anonymous',
+        '.'.join(versions),
+        _digest(request.get_full_path()),
+    )
+
+
+def timeout(request) -> int:
+    if request.user.is_authenticated:
+        return settings.USER_PAGE_CACHE_TIMEOUT
+    return settings.ANONYMOUS_PAGE_CACHE_TIMEOUT
+
+
+def is_cacheable_request(request) -> bool:
+    """GET страницы view, помеченного cacheable_page.
+
+    Адрес разрешается до обращения к кэшу, чтобы 404, статика
+    и некэшируемые view не читали и не заводили поколения путей.
+    """
+    if request.method not in ('GET', 'HEAD') or timeout(request) <= 0:
+        return False
+    try:
+        match = resolve(
+            request.path_info, getattr(request, 'urlconf', None)
+        )
+    except Resolver404:
+        return False
+    request.page_match = match
+    return getattr(match.func, 'cacheable_page', False)
+
+
+def _response(content, headers):
+    response = HttpResponse(content)
+    for header, value in headers:
+        response[header] = value
+    return response
+
+
+def lookup(request, key):
+    """Сохранённый ответ (или 304) либо None.
+
+    Для заготовки возвращается она сама, метки заполняет fill().
+    """
+    entry = cache.get(key)
+    if entry is None:
+        return None
+    content, headers, etag, last_modified = entry
+    if holes.punching(request):
+        response = _response(content, headers)
+        response['Last-Modified'] = http_date(last_modified)
+        return response
+    response = get_conditional_response(
+        request, etag=etag, last_modified=last_modified
+    )
+    if response is None:
+        response = _response(content, headers)
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    return response
+
+
+def _headers(response) -> list:
+    return [
+        (header, value) for header, value in response.items()
+        if header.lower() not in SKIPPED_HEADERS
+    ]
+
+
+def store(request, response, key):
+    if (
+        response.status_code != 200
+        or response.streaming
+        or response.cookies
+        or request.META.get('CSRF_COOKIE_USED')
+    ):
+        return response
+    last_modified = parse_http_date_safe(
+        response.get('Last-Modified', '')
+    ) or int(time.time())
+    if holes.punching(request):
+        cache.set(
+            key, (response.content, _headers(response), None, last_modified),
+            timeout(request),
+        )
+        return response
+    # Валидаторы, которые выставил сам view, сохраняются как есть.
+    etag = response.get('ETag') or quote_etag(
+        hashlib.md5(response.content).hexdigest()
+    )
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    cache.set(
+        key,
+        (response.content, _headers(response), etag, last_modified),
+        timeout(request),
+    )
+    return get_conditional_response(
+        request, etag=etag, last_modified=last_modified, response=response
+    )
+
+
+def fill(request, response):
+    """Заполняет метки заготовки.
+
+    Валидаторы ответа 200 строятся из заготовки и смотрящего
+    (PAGE_CACHE_VIEWER_VALIDATORS), поэтому 304 отдаётся без рендеринга
+    фрагментов.
+    """
+    if response.streaming:
+        return response
+    if response.status_code == 200:
+        viewer, changed = import_string(
+            settings.PAGE_CACHE_VIEWER_VALIDATORS
+        )(request)
+        etag = quote_etag(
+            hashlib.md5(response.content + viewer.encode()).hexdigest()
+        )
+        # Время заготовки не учитывает личные фрагменты смотрящего.
+        last_modified = max(
+            parse_http_date_safe(response.get('Last-Modified', '')) or 0,
+            int(changed),
+        ) or int(time.time())
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+        conditional = get_conditional_response(
+            request, etag=etag, last_modified=last_modified,
+            response=response,
+        )
+        if conditional is not response:
+            return conditional
+    response.content = holes.fill(request, response.content)
+    if response.has_header('Content-Length'):
+        response['Content-Length'] = len(response.content)
+    return response
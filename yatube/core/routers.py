@@ -0,0 +1,102 @@
+"""Чтение с реплик базы данных.
+
+View, помеченные read_from_replica, читают с одной из реплик из
+settings.DATABASE_REPLICAS (по кругу, недоступная реплика пропускается
+REPLICA_RETRY_SECONDS секунд). Запись всегда идёт в default. После
+view, помеченного pins_primary, чтения пользователя REPLICA_PIN_SECONDS
+секунд идут в default, чтобы он сразу видел свои изменения.
+Реплика выбирается в ReplicaRoutingMiddleware один раз на запрос;
+страница, данные которой менялись последние REPLICA_LAG_SECONDS секунд,
+читается из default (см. read_primary_if_changed), чтобы отстающая
+реплика не попала в кэш фрагментов под свежим поколением.
+"""
+import itertools
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+PIN_KEY = 'db_pin:{}'
+
+_state = threading.local()
+_down_until = {}
+_turn = itertools.count()
+
+
+def read_from_replica(view):
+    view.read_from_replica = True
+    return view
+
+
+def pins_primary(view):
+    view.pins_primary = True
+    return view
+
+
+def pin(user):
+    if user.is_authenticated:
+        cache.set(PIN_KEY.format(user.pk), True,
+                  settings.REPLICA_PIN_SECONDS)
+
+
+def is_pinned(user) -> bool:
+    return (
+        user.is_authenticated
+        and cache.get(PIN_KEY.format(user.pk)) is not None
+    )
+
+
+def _is_healthy(alias) -> bool:
+    if _down_until.get(alias, 0) > time.monotonic():
+        return False
+    try:
+        # Подключение к SQLite создаёт пустой файл вместо отсутствующего,
+        # поэтому реплика проверяется настоящим запросом.
+        with connections[alias].cursor() as cursor:
+            cursor.execute('SELECT 1 FROM django_migrations LIMIT 1')
+    except DatabaseError:
+        connections[alias].close()
+        _down_until[alias] = time.monotonic() + settings.REPLICA_RETRY_SECONDS
+        return False
+    _down_until.pop(alias, None)
+    return True
+
+
+def choose_replica() -> str:
+    """Следующая доступная реплика или default, если доступных нет."""
+    replicas = settings.DATABASE_REPLICAS
+    start = next(_turn)
+    for offset in range(len(replicas)):
+        alias = replicas[(start + offset) % len(replicas)]
+        if _is_healthy(alias):
+            return alias
+    return DEFAULT_DB_ALIAS
+
+
+def read_primary_if_changed(changed_at):
+    """Переключает чтения на default, если реплика могла отстать."""
+    if time.time() - changed_at < settings.REPLICA_LAG_SECONDS:
+        use(None)
+
+
+def use(alias):
+    """Направляет чтения текущего потока в alias (None — в default)."""
+    _state.alias = alias
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        return getattr(_state, 'alias', None)
+
+    def db_for_write(self, model, **hints):
+        # Без явного ответа Django сохранил бы объект, прочитанный
+        # с реплики, обратно в реплику.
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        return db not in settings.DATABASE_REPLICAS
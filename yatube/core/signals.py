@@ -0,0 +1,5 @@
+from django.dispatch import Signal
+
+# Рассылается после массовой загрузки фикстуры: сигналы моделей при ней
+# не отправляются, производные данные пересобирают получатели.
+bulk_loaded = Signal(providing_args=['models', 'using'])
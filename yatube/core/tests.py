@@ -1,8 +1,446 @@
-from django.test import TestCase
+import asyncio
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.cache import cache
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management import call_command
+from django.core.serializers.base import DeserializationError
+from django.db import connection, connections
+from django.template import engines
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from core import jobs, metrics, routers
+from core.asgi import ASGIHandler
+from core.cache import TwoTierCache
+from core.loader import iter_objects
+from core.models import Job
+from posts import search
+from posts.models import Comment, Post, TimelineEntry
+from users.models import Profile
+
+User = get_user_model()
+
+TEMP_METRICS_DIR = tempfile.mkdtemp()
 
 
 class ViewTestClass(TestCase):
+    def setUp(self):
+        cache.clear()
+
     def test_error_page(self):
         response = self.client.get('/nonexist-page/')
         self.assertEqual(response.status_code, 404, 'Страница не найдена')
         self.assertTemplateUsed(response, 'core/404.html')
+
+    def test_anonymous_error_page_is_cached(self):
+        """Страница 404 для анонима рендерится один раз"""
+        self.client.get('/nonexist-page/')
+        response = self.client.get('/other-page/<b>')
+        self.assertEqual(response.status_code, 404)
+        self.assertTemplateNotUsed(response, 'core/404.html')
+        self.assertContains(
+            response, '/other-page/&lt;b&gt;', status_code=404
+        )
+
+
+@override_settings(REQUEST_METRICS_DIR=TEMP_METRICS_DIR)
+class RequestMetricsTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_METRICS_DIR, ignore_errors=True)
+
+    def test_server_timing_header(self):
+        """Ответ содержит заголовок Server-Timing"""
+        response = self.client.get('/')
+        self.assertRegex(
+            response['Server-Timing'],
+            r'sql;dur=[\d.]+;desc="\d+ queries", '
+            r'template;dur=[\d.]+, total;dur=[\d.]+'
+        )
+
+    def test_nested_render_is_counted_once(self):
+        """Вложенный рендеринг не добавляет своё время к внешнему"""
+        engine, = engines.all()
+        inner = engine.from_string('внутренний')
+        outer = engine.from_string('{{ inner }}')
+        stats = metrics.start_request()
+        self.addCleanup(metrics.end_request)
+        with mock.patch.object(
+            metrics.time, 'perf_counter', side_effect=[0, 10]
+        ):
+            outer.render({'inner': inner.render})
+        self.assertEqual(stats.template, 10)
+
+    def test_dump_request_metrics(self):
+        """Команда выводит накопленные метрики по имени URL"""
+        self.client.get('/')
+        metrics.flush()
+        out = StringIO()
+        call_command('dump_request_metrics', '--json', stdout=out)
+        rows = {row['view']: row for row in json.loads(out.getvalue())}
+        self.assertGreaterEqual(rows['posts:index']['requests'], 1)
+
+    def test_concurrent_flushes(self):
+        """Одновременный сброс из нескольких потоков не падает"""
+        self.client.get('/')
+        with ThreadPoolExecutor(8) as executor:
+            for future in [executor.submit(metrics.flush) for _ in range(32)]:
+                future.result()
+        self.assertEqual(
+            [name for name in os.listdir(TEMP_METRICS_DIR)
+             if name.endswith('.tmp')],
+            [],
+        )
+
+
+class TwoTierCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.cache = TwoTierCache('default', {
+            'OPTIONS': {
+                'LOCAL_MAX_ENTRIES': 2,
+                'LOCAL_EXCLUDE_PREFIXES': ('version:',),
+            },
+        })
+
+    def test_local_tier_serves_repeated_reads(self):
+        """Повторное чтение берётся из кэша процесса"""
+        self.cache.set('key', 'первое')
+        cache.set('key', 'второе')
+        self.assertEqual(self.cache.get('key'), 'первое')
+        self.cache.delete('key')
+        self.assertIsNone(self.cache.get('key'))
+
+    def test_local_tier_is_bounded_lru(self):
+        """Кэш процесса хранит не больше LOCAL_MAX_ENTRIES ключей"""
+        self.cache.set_many({'a': 1, 'b': 2, 'c': 3})
+        cache.delete('a')
+        self.assertEqual(
+            self.cache.get_many(['a', 'b', 'c']), {'b': 2, 'c': 3}
+        )
+
+    def test_excluded_and_incremented_keys_read_shared_tier(self):
+        """Поколения и счётчики всегда читаются из общего кэша"""
+        self.cache.set('version:global', 1)
+        self.cache.set('counter', 1)
+        cache.incr('version:global')
+        self.cache.incr('counter')
+        self.assertEqual(self.cache.get('version:global'), 2)
+        self.assertEqual(self.cache.get('counter'), 2)
+
+
+class BulkLoadTests(TestCase):
+    FIXTURE = [
+        {'model': 'posts.follow', 'pk': 1,
+         'fields': {'user': 11, 'author': 10}},
+        {'model': 'posts.comment', 'pk': 1,
+         'fields': {'post': 2, 'author': 11, 'text': 'Ответ',
+                    'created': '2022-01-03T00:00:00Z'}},
+        {'model': 'posts.post', 'pk': 1,
+         'fields': {'text': 'Первая запись', 'author': 10, 'group': 5,
+                    'pub_date': '2022-01-01T00:00:00Z'}},
+        {'model': 'posts.post', 'pk': 2,
+         'fields': {'text': 'Вторая запись', 'author': 10, 'group': None,
+                    'pub_date': '2022-01-02T00:00:00Z'}},
+        {'model': 'posts.group', 'pk': 5,
+         'fields': {'title': 'Котики', 'slug': 'cats',
+                    'description': 'Клуб'}},
+        {'model': 'auth.user', 'pk': 10,
+         'fields': {'username': 'leo', 'password': '!',
+                    'date_joined': '2021-01-01T00:00:00Z'}},
+        {'model': 'auth.user', 'pk': 11,
+         'fields': {'username': 'reader', 'password': '!',
+                    'date_joined': '2021-01-01T00:00:00Z'}},
+        {'model': 'sessions.session', 'pk': 'skipped',
+         'fields': {'session_data': '', 'expire_date':
+                    '2022-01-01T00:00:00Z'}},
+    ]
+
+    def setUp(self):
+        handle, self.path = tempfile.mkstemp(suffix='.json')
+        with os.fdopen(handle, 'w') as file:
+            json.dump(self.FIXTURE, file, indent=2)
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def test_iter_objects_streams_small_chunks(self):
+        """Массив разбирается по элементам при любом размере куска"""
+        with open(self.path) as file:
+            self.assertEqual(list(iter_objects(file, 7)), self.FIXTURE)
+        with open(self.path) as file:
+            truncated = StringIO(file.read()[:-40])
+        with self.assertRaises((DeserializationError, ValueError)):
+            list(iter_objects(truncated, 7))
+
+    def test_bulkload_rebuilds_derived_data(self):
+        """Загрузка сохраняет даты и пересобирает производные данные"""
+        out = StringIO()
+        call_command(
+            'bulkload', self.path, '--batch-size', '1',
+            '-e', 'sessions', stdout=out,
+        )
+        self.assertIn('строк/с', out.getvalue())
+        self.assertEqual(Post.objects.count(), 2)
+        self.assertEqual(Comment.objects.count(), 1)
+        self.assertEqual(
+            Post.objects.get(pk=1).pub_date.isoformat(),
+            '2022-01-01T00:00:00+00:00',
+        )
+        self.assertEqual(Post.objects.get(pk=2).comments_count, 1)
+        self.assertEqual(Profile.objects.get(user_id=10).posts_count, 2)
+        self.assertEqual(
+            TimelineEntry.objects.filter(user_id=11).count(), 2
+        )
+        self.assertEqual(
+            [post_id for _, post_id in search.rank('запись')], [2, 1]
+        )
+        Post.objects.create(text='Новая', author_id=10)
+        self.assertEqual(Post.objects.latest('pk').pk, 3)
+
+
+@override_settings(
+    DATABASE_REPLICAS=['replica'],
+    REPLICA_LAG_SECONDS=0,
+    REPLICA_PIN_SECONDS=10,
+)
+class ReplicaRoutingTests(TestCase):
+    """Реплика — файл SQLite, который тест копирует из default."""
+
+    def setUp(self):
+        cache.clear()
+        self.replica_dir = tempfile.mkdtemp()
+        self.add_replica('replica')
+        self.author = User.objects.create_user(username='writer')
+        self.client.force_login(self.author)
+        self.sync_replica()
+
+    def tearDown(self):
+        for alias in ('replica', 'replica2'):
+            self.remove_replica(alias)
+        routers._down_until.clear()
+        shutil.rmtree(self.replica_dir, ignore_errors=True)
+
+    def remove_replica(self, alias):
+        if alias in connections.databases:
+            connections[alias].close()
+            del connections[alias]
+            del connections.databases[alias]
+
+    def add_replica(self, alias, name=None):
+        self.remove_replica(alias)
+        connections.databases[alias] = {
+            **connections.databases['default'],
+            'NAME': name or os.path.join(self.replica_dir, f'{alias}.db'),
+        }
+
+    def sync_replica(self, alias='replica'):
+        # backup() ждёт конца транзакции теста, iterdump() видит её данные.
+        name = connections.databases[alias]['NAME']
+        connections[alias].close()
+        if os.path.exists(name):
+            os.remove(name)
+        connection.ensure_connection()
+        replica = sqlite3.connect(name)
+        replica.executescript('\n'.join(connection.connection.iterdump()))
+        replica.close()
+
+    def create_post(self):
+        return Post.objects.create(author=self.author, text='Не на реплике')
+
+    def test_read_views_use_replica(self):
+        """Ленты читаются с реплики, запись идёт в default"""
+        self.create_post()
+        response = self.client.get(reverse('posts:index'))
+        self.assertNotContains(response, 'Не на реплике')
+
+    @override_settings(REPLICA_LAG_SECONDS=60)
+    def test_recent_changes_read_primary(self):
+        """Недавно изменённая лента читается из default"""
+        self.create_post()
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, 'Не на реплике')
+
+    def test_writer_is_pinned_to_primary(self):
+        """После записи пользователь читает из default"""
+        post = self.create_post()
+        self.client.post(
+            reverse('posts:add_comment', args=(post.id,)),
+            {'text': 'Комментарий'},
+        )
+        self.assertContains(
+            self.client.get(reverse('posts:index')), 'Не на реплике'
+        )
+        cache.delete(routers.PIN_KEY.format(self.author.pk))
+        url = reverse('posts:profile', args=(self.author.username,))
+        self.assertNotContains(self.client.get(url), 'Не на реплике')
+
+    def test_unavailable_replica_is_skipped(self):
+        """Недоступная реплика пропускается, чтения идут в default"""
+        self.add_replica('replica', os.path.join(self.replica_dir, 'no/db'))
+        self.create_post()
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, 'Не на реплике')
+        self.assertIn('replica', routers._down_until)
+
+    def test_missing_replica_file_is_skipped(self):
+        """Реплика без файла базы пропускается, а не отвечает 500"""
+        self.add_replica(
+            'replica', os.path.join(self.replica_dir, 'missing.db')
+        )
+        self.create_post()
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, 'Не на реплике')
+        self.assertIn('replica', routers._down_until)
+
+    @override_settings(DATABASE_REPLICAS=['replica', 'replica2'])
+    def test_replicas_take_turns(self):
+        """Реплики выбираются по кругу"""
+        self.add_replica('replica2')
+        self.sync_replica('replica2')
+        self.assertEqual(
+            {routers.choose_replica(), routers.choose_replica()},
+            {'replica', 'replica2'},
+        )
+
+
+FAILURES = []
+
+
+@jobs.task
+def record(value):
+    FAILURES.append(value)
+
+
+@jobs.task
+def fail(value):
+    FAILURES.append(value)
+    raise ValueError(value)
+
+
+@override_settings(
+    JOBS_EAGER=False, JOBS_MAX_ATTEMPTS=2, JOBS_RETRY_DELAY=10,
+    EMAIL_BACKEND='core.backends.email.QueuedEmailBackend',
+    JOBS_EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+)
+class JobQueueTests(TestCase):
+    def setUp(self):
+        FAILURES.clear()
+
+    def run_jobs(self):
+        out = StringIO()
+        call_command('run_jobs', '--once', '--workers=1', stdout=out)
+        return out.getvalue()
+
+    def test_worker_runs_queued_job(self):
+        """Задача выполняется воркером, а не при постановке"""
+        job = jobs.enqueue(record, 'значение')
+        self.assertEqual(FAILURES, [])
+        self.assertIn('Выполнено задач: 1', self.run_jobs())
+        self.assertEqual(FAILURES, ['значение'])
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.DONE, 1))
+
+    def test_failed_job_is_retried_with_backoff(self):
+        """Упавшая задача откладывается и после последней попытки падает"""
+        job = jobs.enqueue(fail, 'ошибка')
+        self.run_jobs()
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.QUEUED)
+        self.assertIn('ValueError', job.last_error)
+        self.assertGreater(job.run_after, timezone.now())
+        self.assertIn('Выполнено задач: 0', self.run_jobs())
+        Job.objects.filter(pk=job.pk).update(run_after=timezone.now())
+        self.run_jobs()
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.FAILED, 2))
+        self.assertEqual(FAILURES, ['ошибка', 'ошибка'])
+
+    def test_expired_lock_is_reclaimed(self):
+        """Задачу умершего воркера забирает другой воркер"""
+        job = jobs.enqueue(record, 'снова')
+        self.assertEqual(jobs.claim(10), [job])
+        self.assertEqual(jobs.claim(10), [])
+        Job.objects.filter(pk=job.pk).update(
+            locked_until=timezone.now() - timedelta(seconds=1)
+        )
+        self.run_jobs()
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.DONE, 2))
+
+    @override_settings(JOBS_EAGER=True)
+    def test_eager_mode_skips_queue(self):
+        """При JOBS_EAGER задача не попадает в таблицу очереди"""
+        self.assertIsNone(jobs.enqueue(record, 'сразу'))
+        self.assertFalse(Job.objects.exists())
+
+    def test_email_is_sent_by_worker(self):
+        """Письмо уходит из фоновой задачи"""
+        mail.send_mail('Тема', 'Текст', 'from@yatube.ru', ['to@yatube.ru'])
+        self.assertEqual(mail.outbox, [])
+        self.run_jobs()
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].subject, 'Тема')
+        self.assertEqual(mail.outbox[0].to, ['to@yatube.ru'])
+
+
+class ASGIHandlerTests(TestCase):
+    def setUp(self):
+        self.application = ASGIHandler(WSGIHandler(), threads=1)
+
+    def tearDown(self):
+        self.application.executor.shutdown()
+
+    def call(self, scope, messages):
+        incoming = iter(messages)
+        sent = []
+
+        async def receive():
+            return next(incoming)
+
+        async def send(message):
+            sent.append(message)
+
+        asyncio.run(self.application(scope, receive, send))
+        return sent
+
+    def test_http_request(self):
+        """Запрос проходит через Django, тело отдаётся частями"""
+        sent = self.call({
+            'type': 'http', 'method': 'GET', 'path': '/about/author/',
+            'query_string': b'', 'headers': [(b'host', b'testserver')],
+        }, [{'type': 'http.request', 'body': b''}])
+        self.assertEqual(sent[0]['type'], 'http.response.start')
+        self.assertEqual(sent[0]['status'], 200)
+        self.assertIn(
+            (b'content-type', b'text/html; charset=utf-8'), sent[0]['headers']
+        )
+        self.assertTrue(all(
+            message['more_body'] for message in sent[1:-1]
+        ))
+        self.assertNotIn('more_body', sent[-1])
+        body = b''.join(message['body'] for message in sent[1:])
+        self.assertIn('</html>', body.decode())
+
+    def test_lifespan(self):
+        """Сервер получает подтверждение запуска и остановки"""
+        sent = self.call({'type': 'lifespan'}, [
+            {'type': 'lifespan.startup'}, {'type': 'lifespan.shutdown'},
+        ])
+        self.assertEqual(
+            [message['type'] for message in sent],
+            ['lifespan.startup.complete', 'lifespan.shutdown.complete'],
+        )
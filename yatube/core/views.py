@@ -1,8 +1,32 @@
+from django.core.cache import cache
+from django.http import HttpResponseNotFound
 from django.shortcuts import render
+from django.utils.html import escape
+
+NOT_FOUND_KEY = 'page_404:{}'
+NOT_FOUND_TIMEOUT: int = 60 * 60
+PATH_PLACEHOLDER = 'page-not-found-path-placeholder'
 
 
 def page_not_found(request, exception):
-    return render(request, 'core/404.html', {'path': request.path}, status=404)
+    if request.user.is_authenticated:
+        return render(
+            request, 'core/404.html', {'path': request.path}, status=404
+        )
+    # Анонимная страница 404 одинакова для всех адресов одного view,
+    # кроме самого адреса: её HTML рендерится один раз и хранится
+    # в кэше, а адрес подставляется при ответе.
+    match = request.resolver_match
+    key = NOT_FOUND_KEY.format(match.view_name if match else '')
+    content = cache.get(key)
+    if content is None:
+        content = render(
+            request, 'core/404.html', {'path': PATH_PLACEHOLDER}
+        ).content.decode()
+        cache.set(key, content, NOT_FOUND_TIMEOUT)
+    return HttpResponseNotFound(
+        content.replace(PATH_PLACEHOLDER, escape(request.path))
+    )
 
 
 def csrf_failure(request, reason=''):
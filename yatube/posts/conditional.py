@@ -0,0 +1,140 @@
+"""Условные GET (ETag / Last-Modified) для лент и страницы поста.
+
+Валидаторы строятся из поколений и времени изменения лент
+(posts/versions.py), поэтому проверка If-None-Match или
+If-Modified-Since не читает посты: хватает пары запросов к кэшу.
+"""
+import hashlib
+from datetime import datetime, timezone
+
+from core import routers
+from django.views.decorators.http import condition
+
+from . import follows, lookups, versions
+from .models import Post
+
+
+def _viewer_scopes(request) -> set:
+    # Кнопки подписки на страницах зависят от подписок смотрящего.
+    user = request.user
+    if not user.is_authenticated:
+        return set()
+    return {versions.follows_scope(user.pk)}
+
+
+def _viewer(request) -> str:
+    # В страницу входят имя пользователя и CSRF-токен формы.
+    csrf_cookie = request.META.get('CSRF_COOKIE', '')
+    return '{}:{}'.format(
+        request.user.pk or 0,
+        hashlib.md5(csrf_cookie.encode()).hexdigest(),
+    )
+
+
+def viewer_validators(request) -> tuple:
+    """Смотрящий и поколения его подписок для ETag и время их изменения
+    для Last-Modified: от них зависят личные фрагменты страницы.
+    """
+    scopes = sorted(_viewer_scopes(request))
+    value = '|'.join([
+        _viewer(request),
+        *(f'{scope}={version}'
+          for scope, version in versions.get_versions(*scopes).items()),
+    ])
+    return value, versions.last_changed(*scopes)
+
+
+def scope_condition(get_scopes):
+    """Декоратор view: get_scopes(request, *args, **kwargs) возвращает
+    ленты, из которых собрана страница, или None, если объекта нет.
+    """
+    def validators(request, *args, **kwargs):
+        if not hasattr(request, '_scope_validators'):
+            scopes = get_scopes(request, *args, **kwargs)
+            request._scope_validators = None
+            if scopes is not None:
+                scopes = sorted(scopes | _viewer_scopes(request))
+                changed = versions.last_changed(*scopes)
+                routers.read_primary_if_changed(changed)
+                request._scope_validators = (
+                    versions.get_versions(*scopes), changed
+                )
+        return request._scope_validators
+
+    def etag(request, *args, **kwargs):
+        found = validators(request, *args, **kwargs)
+        if found is None:
+            return None
+        scope_versions, _ = found
+        value = '|'.join([
+            _viewer(request),
+            request.get_full_path(),
+            *(f'{scope}={version}'
+              for scope, version in sorted(scope_versions.items())),
+        ])
+        return hashlib.md5(value.encode()).hexdigest()
+
+    def last_modified(request, *args, **kwargs):
+        found = validators(request, *args, **kwargs)
+        if found is None:
+            return None
+        _, changed = found
+        return datetime.fromtimestamp(changed, tz=timezone.utc)
+
+    return condition(etag_func=etag, last_modified_func=last_modified)
+
+
+def scope_versions(request, scopes) -> dict:
+    """Поколения scopes, по возможности уже прочитанные для ETag."""
+    found = getattr(request, '_scope_validators', None)
+    if found is not None and set(scopes) <= found[0].keys():
+        return {scope: found[0][scope] for scope in scopes}
+    return versions.get_versions(*scopes)
+
+
+def index_scopes(request) -> set:
+    return {versions.GLOBAL}
+
+
+def group_scopes(request, slug):
+    group = lookups.group_by_slug(slug)
+    if group is None:
+        return None
+    return {versions.group_scope(group.id)}
+
+
+def profile_scopes(request, username):
+    author = lookups.user_by_username(username)
+    if author is None:
+        return None
+    return {versions.author_scope(author.id)}
+
+
+def follow_scopes(request) -> set:
+    return {
+        versions.author_scope(author_id)
+        for author_id in follows.followed_ids(request.user)
+    }
+
+
+def post_scopes(request, post_id):
+    # Пост и его комментарии меняют ленту post:<id>, имя и число постов
+    # автора — ленту автора, название группы — ленту группы.
+    post = Post.objects.filter(pk=post_id).values(
+        'author_id', 'group_id'
+    ).first()
+    if post is None:
+        return None
+    scopes = {
+        versions.post_scope(post_id),
+        versions.author_scope(post['author_id']),
+    }
+    if post['group_id']:
+        scopes.add(versions.group_scope(post['group_id']))
+    return scopes
+
+
+def comments_scopes(request, post_id):
+    if not Post.objects.filter(pk=post_id).exists():
+        return None
+    return {versions.post_scope(post_id)}
@@ -0,0 +1,158 @@
+"""Денормализованные счётчики постов автора и комментариев поста.
+
+Число постов лент (вся лента, группа, автор) хранится в кэше под
+FEED_COUNT_KEY и меняется инкрементом при создании и удалении поста,
+а не пересчитывается COUNT(*) на каждый запрос. Число постов ленты
+подписок складывается из счётчиков авторов.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from users.models import Profile
+
+from . import follows, timeline, versions
+from .models import Comment, Post, User
+
+FEED_COUNT_KEY = 'feed_count:{}'
+
+
+def change_posts_count(author_id, delta):
+    updated = Profile.objects.filter(user_id=author_id).update(
+        posts_count=F('posts_count') + delta
+    )
+    if not updated and delta > 0:
+        Profile.objects.get_or_create(
+            user_id=author_id,
+            defaults={
+                'posts_count': Post.objects.filter(author_id=author_id).count()
+            },
+        )
+
+
+def posts_count(author) -> int:
+    """Число постов автора из записи lookups или профиля; недостающий
+    профиль создаётся на месте.
+    """
+    count = getattr(author, 'posts_count', None)
+    if count is not None:
+        return count
+    profile = getattr(author, 'profile', None)
+    if profile is None:
+        profile, _ = Profile.objects.get_or_create(
+            user_id=author.pk,
+            defaults={
+                'posts_count': Post.objects.filter(author_id=author.pk).count()
+            },
+        )
+    return profile.posts_count
+
+
+def change_comments_count(post_id, delta):
+    if post_id is not None:
+        Post.objects.filter(pk=post_id).update(
+            comments_count=F('comments_count') + delta
+        )
+
+
+def _count_subquery(queryset, field, outer='pk'):
+    return Coalesce(
+        Subquery(
+            queryset.filter(**{field: OuterRef(outer)}).order_by().values(
+                field
+            ).annotate(count=Count('pk')).values('count')
+        ),
+        0,
+    )
+
+
+def reconcile():
+    """Пересчитывает счётчики, возвращает число исправленных строк."""
+    fixed = 0
+    posts = Post.objects.annotate(
+        actual=_count_subquery(Comment.objects.all(), 'post')
+    ).exclude(comments_count=F('actual')).values_list('pk', 'actual')
+    for pk, actual in posts:
+        fixed += Post.objects.filter(pk=pk).update(comments_count=actual)
+    Profile.objects.bulk_create(
+        Profile(user_id=pk) for pk in User.objects.filter(
+            profile__isnull=True
+        ).values_list('pk', flat=True)
+    )
+    profiles = Profile.objects.annotate(
+        actual=_count_subquery(Post.objects.all(), 'author', 'user_id')
+    ).exclude(
+        posts_count=F('actual')
+    ).values_list('pk', 'actual')
+    for pk, actual in profiles:
+        fixed += Profile.objects.filter(pk=pk).update(posts_count=actual)
+    return fixed
+
+
+def feed_scopes(post) -> set:
+    scopes = {versions.GLOBAL, versions.author_scope(post.author_id)}
+    if post.group_id:
+        scopes.add(versions.group_scope(post.group_id))
+    return scopes
+
+
+def feed_count(scope, count) -> int:
+    """Число постов ленты scope; count() считает его при промахе кэша."""
+    key = FEED_COUNT_KEY.format(scope)
+    value = cache.get(key)
+    if value is None:
+        value = count()
+        cache.set(key, value, settings.FEED_CACHE_TIMEOUT)
+    return value
+
+
+def change_feed_counts(scopes, delta):
+    for scope in scopes:
+        try:
+            cache.incr(FEED_COUNT_KEY.format(scope), delta)
+        except ValueError:
+            # Счётчика нет в кэше: он будет посчитан при чтении.
+            pass
+
+
+def forget_feed_counts(*scopes):
+    cache.delete_many([FEED_COUNT_KEY.format(scope) for scope in scopes])
+
+
+def author_feed_counts(author_ids) -> dict:
+    keys = {
+        FEED_COUNT_KEY.format(versions.author_scope(pk)): pk
+        for pk in author_ids
+    }
+    counts = {keys[key]: count for key, count in cache.get_many(keys).items()}
+    missing = set(keys.values()) - counts.keys()
+    if missing:
+        found = dict.fromkeys(missing, 0)
+        found.update(Post.objects.filter(
+            author_id__in=missing
+        ).order_by().values('author_id').annotate(
+            count=Count('id')
+        ).values_list('author_id', 'count'))
+        cache.set_many({
+            FEED_COUNT_KEY.format(versions.author_scope(pk)): count
+            for pk, count in found.items()
+        }, settings.FEED_CACHE_TIMEOUT)
+        counts.update(found)
+    return counts
+
+
+def follow_feed_count(user) -> int:
+    """Число постов ленты подписок по счётчикам авторов.
+
+    Посты обычных авторов лента хранит не больше TIMELINE_MAX_LENGTH,
+    посты знаменитостей подмешиваются все (см. posts.timeline).
+    """
+    author_ids = follows.followed_ids(user)
+    counts = author_feed_counts(author_ids)
+    pulled = set(timeline.celebrities(author_ids))
+    fanned_out = sum(
+        count for pk, count in counts.items() if pk not in pulled
+    )
+    return min(fanned_out, settings.TIMELINE_MAX_LENGTH) + sum(
+        counts[pk] for pk in pulled
+    )
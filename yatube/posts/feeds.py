@@ -0,0 +1,151 @@
+"""Ленты в два уровня кэша: списки id страниц и записи постов.
+
+Страница ленты — это упорядоченный список id под ключом из поколений
+её лент (posts/versions.py) и номера страницы; изменение ленты меняет
+ключ. Сами посты хранятся отдельно компактными записями, общими для
+всех лент, и собираются одним get_many; промахи дочитываются одним
+запросом id__in. Автор и группа хранятся своими записями, поэтому
+правка поста, переименование автора или группы сбрасывают по одному
+ключу.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import Page
+from django.db import DEFAULT_DB_ALIAS
+
+from .models import Group, Post, User
+from .paginators import WindowPaginator
+
+IDS_KEY = 'feed_ids:{}:{}'
+POST_KEY = 'feed_post:{}'
+AUTHOR_KEY = 'feed_author:{}'
+GROUP_KEY = 'feed_group:{}'
+
+
+def _ordered(model, names) -> tuple:
+    # from_db ждёт значения в порядке полей модели.
+    return tuple(
+        field.attname for field in model._meta.concrete_fields
+        if field.attname in names
+    )
+
+
+POST_FIELDS = _ordered(
+    Post, ('id', 'text', 'pub_date', 'image', 'author_id', 'group_id')
+)
+AUTHOR_FIELDS = _ordered(User, ('id', 'username', 'first_name', 'last_name'))
+GROUP_FIELDS = _ordered(Group, ('id', 'title', 'slug'))
+
+
+def _record(obj, fields) -> tuple:
+    return tuple(
+        getattr(obj, field).name if field == 'image' else getattr(obj, field)
+        for field in fields
+    )
+
+
+def remember(posts):
+    """Кладёт в кэш записи постов, их авторов и групп."""
+    records = {}
+    for post in posts:
+        records[POST_KEY.format(post.pk)] = _record(post, POST_FIELDS)
+        records[AUTHOR_KEY.format(post.author_id)] = _record(
+            post.author, AUTHOR_FIELDS
+        )
+        if post.group_id:
+            records[GROUP_KEY.format(post.group_id)] = _record(
+                post.group, GROUP_FIELDS
+            )
+    cache.set_many(records, settings.FEED_CACHE_TIMEOUT)
+
+
+def _cached(model, key, ids, fields) -> dict:
+    keys = {key.format(pk): pk for pk in set(ids)}
+    return {
+        keys[found]: model.from_db(DEFAULT_DB_ALIAS, fields, record)
+        for found, record in cache.get_many(keys).items()
+    }
+
+
+def _related(model, key, ids, fields) -> dict:
+    """Авторы или группы по id: из кэша, промахи — одним запросом."""
+    found = _cached(model, key, ids, fields)
+    missing = set(ids) - found.keys()
+    if missing:
+        fetched = model.objects.filter(pk__in=missing).only(*fields)
+        cache.set_many({
+            key.format(obj.pk): _record(obj, fields) for obj in fetched
+        }, settings.FEED_CACHE_TIMEOUT)
+        found.update((obj.pk, obj) for obj in fetched)
+    return found
+
+
+def get_posts(ids) -> list:
+    """Посты с автором и группой в порядке ids, удалённые пропускаются."""
+    posts = _cached(Post, POST_KEY, ids, POST_FIELDS)
+    missing = set(ids) - posts.keys()
+    if missing:
+        fetched = list(Post.objects.filter(pk__in=missing).for_feed())
+        remember(fetched)
+        posts.update((post.pk, post) for post in fetched)
+    cached = [post for post in posts.values() if post.pk not in missing]
+    authors = _related(
+        User, AUTHOR_KEY, {post.author_id for post in cached}, AUTHOR_FIELDS
+    )
+    groups = _related(
+        Group, GROUP_KEY,
+        {post.group_id for post in cached if post.group_id}, GROUP_FIELDS,
+    )
+    for post in cached:
+        post.author = authors[post.author_id]
+        post.group = groups.get(post.group_id)
+    return [posts[pk] for pk in ids if pk in posts]
+
+
+def forget_post(post_id):
+    cache.delete(POST_KEY.format(post_id))
+
+
+def forget_author(user_id):
+    cache.delete(AUTHOR_KEY.format(user_id))
+
+
+def forget_group(group_id):
+    cache.delete(GROUP_KEY.format(group_id))
+
+
+class FeedPaginator(WindowPaginator):
+    """WindowPaginator, который берёт страницы из кэша лент.
+
+    scope_versions — поколения лент, из которых собрана страница:
+    список id страницы хранится под ключом из них и номера страницы.
+    """
+
+    def __init__(self, object_list, per_page, count=None,
+                 scope_versions=None):
+        super().__init__(object_list, per_page, count)
+        self.feed_key = hashlib.md5('|'.join(
+            f'{scope}={version}'
+            for scope, version in sorted(scope_versions.items())
+        ).encode()).hexdigest()
+
+    def page(self, number):
+        number = self.validate_number(number)
+        key = IDS_KEY.format(self.feed_key, number)
+        ids = cache.get(key)
+        if ids is None:
+            # Промах списка: строки страницы читаются как раньше, одним
+            # запросом, и заодно пополняют кэш записей.
+            bottom = (number - 1) * self.per_page
+            posts = list(self.object_list[bottom:bottom + self.per_page])
+            remember(posts)
+            cache.set(
+                key, [post.pk for post in posts], settings.FEED_CACHE_TIMEOUT
+            )
+        else:
+            posts = get_posts(ids)
+        page = Page(posts, number, self)
+        page.window = self.window(number)
+        return page
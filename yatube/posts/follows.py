@@ -0,0 +1,54 @@
+"""Граф подписок в кэше.
+
+Для каждого пользователя в кэше лежит отсортированный массив id авторов,
+на которых он подписан (array, 8 байт на подписку). Проверка подписки —
+двоичный поиск, без запросов к БД при тёплом кэше. Массив пересобирается
+сигналами при создании и удалении Follow.
+"""
+from array import array
+from bisect import bisect_left
+
+from django.core.cache import cache
+
+from .models import Follow
+
+FOLLOWING_KEY = 'follows:{}'
+TYPECODE = 'q'
+
+
+def _load(user_id) -> array:
+    ids = array(TYPECODE, Follow.objects.filter(
+        user_id=user_id
+    ).order_by('author_id').values_list('author_id', flat=True))
+    cache.set(FOLLOWING_KEY.format(user_id), ids.tobytes(), None)
+    return ids
+
+
+def refresh(user_id):
+    _load(user_id)
+
+
+def forget(*user_ids):
+    cache.delete_many([FOLLOWING_KEY.format(pk) for pk in user_ids])
+
+
+def followed_ids(user) -> array:
+    """Отсортированные id авторов; запоминаются на объекте пользователя."""
+    if not user.is_authenticated:
+        return array(TYPECODE)
+    ids = getattr(user, '_followed_ids', None)
+    if ids is None:
+        data = cache.get(FOLLOWING_KEY.format(user.pk))
+        if data is None:
+            ids = _load(user.pk)
+        else:
+            ids = array(TYPECODE)
+            ids.frombytes(data)
+        user._followed_ids = ids
+    return ids
+
+
+def is_following(user, author_id) -> bool:
+    ids = followed_ids(user)
+    index = bisect_left(ids, author_id)
+    return index < len(ids) and ids[index] == author_id
@@ -0,0 +1,78 @@
+"""Кэш поиска группы по slug и пользователя по username.
+
+Найденный объект хранится компактной записью, отсутствие — отметкой
+MISSING на LOOKUP_MISS_TIMEOUT секунд, чтобы боты, перебирающие
+несуществующие адреса, не ходили в базу. Сохранение и удаление группы
+или пользователя сбрасывают записи старого и нового имени (см.
+posts/signals.py). В запись пользователя входит число его постов из
+профиля, поэтому её сбрасывает и новый или удалённый пост.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.http import Http404
+
+from .models import Group, User
+
+LOOKUP_KEY = 'lookup:{}:{}'
+LOOKUP_MISS_TIMEOUT: int = 60
+MISSING = False
+GROUP_FIELDS = ('id', 'title', 'slug', 'description')
+USER_FIELDS = ('id', 'username', 'first_name', 'last_name')
+USER_EXTRA = {'posts_count': 'profile__posts_count'}
+
+
+def lookup_key(model, value) -> str:
+    # В адресе может быть что угодно, ключ кэша должен быть коротким.
+    return LOOKUP_KEY.format(
+        model._meta.label_lower, hashlib.md5(value.encode()).hexdigest()
+    )
+
+
+def _lookup(model, field, value, fields, extra=None):
+    extra = extra or {}
+    key = lookup_key(model, value)
+    record = cache.get(key)
+    if record is None:
+        record = model.objects.filter(**{field: value}).values_list(
+            *fields, *extra.values()
+        ).first() or MISSING
+        timeout = (
+            LOOKUP_MISS_TIMEOUT if record is MISSING
+            else settings.FEED_CACHE_TIMEOUT
+        )
+        cache.set(key, record, timeout)
+    if record is MISSING:
+        return None
+    instance = model.from_db(DEFAULT_DB_ALIAS, fields, record[:len(fields)])
+    for name, value in zip(extra, record[len(fields):]):
+        setattr(instance, name, value)
+    return instance
+
+
+def group_by_slug(slug):
+    return _lookup(Group, 'slug', slug, GROUP_FIELDS)
+
+
+def user_by_username(username):
+    return _lookup(User, 'username', username, USER_FIELDS, USER_EXTRA)
+
+
+def get_group_or_404(slug):
+    group = group_by_slug(slug)
+    if group is None:
+        raise Http404('Группа не найдена')
+    return group
+
+
+def get_user_or_404(username):
+    user = user_by_username(username)
+    if user is None:
+        raise Http404('Пользователь не найден')
+    return user
+
+
+def forget(model, *values):
+    cache.delete_many([lookup_key(model, value) for value in values])
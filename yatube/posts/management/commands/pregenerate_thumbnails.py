@@ -0,0 +1,36 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from posts import thumbnails
+from posts.models import Post
+
+
+def generate(name):
+    # Ошибка уже записана в лог, одна картинка не должна прерывать обход.
+    try:
+        return thumbnails.generate(name)
+    except Exception:
+        return None
+
+
+class Command(BaseCommand):
+    help = 'Создаёт недостающие миниатюры для картинок постов'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=4,
+            help='Число потоков; 1 — генерировать в текущем потоке',
+        )
+
+    def handle(self, *args, **options):
+        names = Post.objects.exclude(image='').order_by().values_list(
+            'image', flat=True
+        ).distinct()
+        if options['workers'] > 1:
+            with ThreadPoolExecutor(options['workers']) as executor:
+                results = list(executor.map(generate, names))
+        else:
+            results = [generate(name) for name in names]
+        done = sum(result is not None for result in results)
+        self.stdout.write(self.style.SUCCESS(f'Миниатюр готово: {done}'))
@@ -0,0 +1,138 @@
+# Generated by Django 2.2.16 on 2026-10-18 21:14
+
+import re
+from collections import Counter
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+# Копия posts.stemmer на момент миграции: индекс, построенный миграцией,
+# не должен зависеть от будущих правок стеммера.
+MIN_TERM_LENGTH: int = 2
+MAX_TERM_LENGTH: int = 64
+
+# Дореформенная орфография встречается в постах (дневники Толстого).
+NORMALIZE = str.maketrans({'ё': 'е', 'ѣ': 'е', 'і': 'и', 'ѳ': 'ф', 'ѵ': 'и'})
+WORD = re.compile(r'\w+')
+
+RVRE = re.compile(r'^(.*?[аеиоуыэюя])(.*)$')
+PERFECTIVE_GERUND = re.compile(
+    r'((ив|ивши|ившись|ыв|ывши|ывшись)|((?<=[ая])(в|вши|вшись)))$'
+)
+REFLEXIVE = re.compile(r'(с[яь])$')
+ADJECTIVE = re.compile(
+    r'(ее|ие|ые|ое|ими|ыми|ей|ий|ый|ой|ем|им|ым|ом|его|ого|ему|ому|их|ых|'
+    r'ую|юю|ая|яя|ою|ею)$'
+)
+PARTICIPLE = re.compile(r'((ивш|ывш|ующ)|((?<=[ая])(ем|нн|вш|ющ|щ)))$')
+VERB = re.compile(
+    r'((ила|ыла|ена|ейте|уйте|ите|или|ыли|ей|уй|ил|ыл|им|ым|ен|ило|ыло|'
+    r'ено|ят|ует|уют|ит|ыт|ены|ить|ыть|ишь|ую|ю)|'
+    r'((?<=[ая])(ла|на|ете|йте|ли|й|л|ем|н|ло|но|ет|ют|ны|ть|ешь|нно)))$'
+)
+NOUN = re.compile(
+    r'(а|ев|ов|ие|ье|е|иями|ями|ами|еи|ии|и|ией|ей|ой|ий|й|иям|ям|ием|ем|'
+    r'ам|ом|о|у|ах|иях|ях|ы|ь|ию|ью|ю|ия|ья|я)$'
+)
+DERIVATIONAL_R2 = re.compile(r'.*[^аеиоуыэюя]+[аеиоуыэюя].*ость?$')
+DERIVATIONAL = re.compile(r'ость?$')
+SUPERLATIVE = re.compile(r'(ейше|ейш)$')
+
+
+def stem(word) -> str:
+    word = word.lower().translate(NORMALIZE)
+    if word.endswith('ъ'):
+        word = word[:-1]
+    match = RVRE.match(word)
+    if not match:
+        return word
+    start, rv = match.groups()
+    stripped = PERFECTIVE_GERUND.sub('', rv, 1)
+    if stripped == rv:
+        rv = REFLEXIVE.sub('', rv, 1)
+        stripped = ADJECTIVE.sub('', rv, 1)
+        if stripped != rv:
+            rv = PARTICIPLE.sub('', stripped, 1)
+        else:
+            stripped = VERB.sub('', rv, 1)
+            rv = NOUN.sub('', rv, 1) if stripped == rv else stripped
+    else:
+        rv = stripped
+    if rv.endswith('и'):
+        rv = rv[:-1]
+    if DERIVATIONAL_R2.match(rv):
+        rv = DERIVATIONAL.sub('', rv, 1)
+    if rv.endswith('ь'):
+        rv = rv[:-1]
+    else:
+        rv = SUPERLATIVE.sub('', rv, 1)
+        if rv.endswith('нн'):
+            rv = rv[:-1]
+    return start + rv
+
+
+def terms(text) -> Counter:
+    """Основы слов текста с числом вхождений."""
+    result = Counter()
+    for word in WORD.findall(text.lower()):
+        term = stem(word)[:MAX_TERM_LENGTH]
+        if len(term) >= MIN_TERM_LENGTH:
+            result[term] += 1
+    return result
+
+
+def create_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    Post = apps.get_model('posts', 'Post')
+    SearchTerm = apps.get_model('posts', 'SearchTerm')
+    fts5 = False
+    if connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5')")
+            fts5 = bool(cursor.fetchone()[0])
+    if not fts5:
+        for pk, text in Post.objects.values_list('pk', 'text').iterator():
+            SearchTerm.objects.bulk_create(
+                SearchTerm(term=term, post_id=pk, frequency=frequency)
+                for term, frequency in terms(text).items()
+            )
+        return
+    with connection.cursor() as cursor:
+        cursor.execute('CREATE VIRTUAL TABLE posts_post_fts USING fts5(terms)')
+        for pk, text in Post.objects.values_list('pk', 'text').iterator():
+            cursor.execute(
+                'INSERT INTO posts_post_fts (rowid, terms) VALUES (%s, %s)',
+                [pk, ' '.join(terms(text).elements())],
+            )
+
+
+def drop_search_index(apps, schema_editor):
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute('DROP TABLE IF EXISTS posts_post_fts')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0015_post_comments_count'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchTerm',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=64, verbose_name='Основа слова')),
+                ('frequency', models.PositiveIntegerField(verbose_name='Число вхождений')),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_terms', to='posts.Post')),
+            ],
+            options={
+                'verbose_name_plural': 'Поисковый индекс',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='searchterm',
+            index=models.Index(fields=['term', 'post'], name='search_term_idx'),
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -1,10 +1,24 @@
 from core.models import CreateModel, PubDateModel
 from django.contrib.auth import get_user_model
-from django.db import models
+from django.db import models, transaction
 from django.db.models.constraints import UniqueConstraint
 
 User = get_user_model()
 COUNT_SYMBOL = 15
+FEED_FIELDS = (
+    'id',
+    'text',
+    'pub_date',
+    'image',
+    'comments_count',
+    'author_id',
+    'group_id',
+    'author__username',
+    'author__first_name',
+    'author__last_name',
+    'group__title',
+    'group__slug',
+)
 
 
 class Group(models.Model):
@@ -19,6 +33,12 @@ class Group(models.Model):
         verbose_name_plural = 'Группы'
 
 
+class PostQuerySet(models.QuerySet):
+    def for_feed(self):
+        """Посты с автором и группой одним запросом, только нужные поля."""
+        return self.select_related('author', 'group').only(*FEED_FIELDS)
+
+
 class Post(PubDateModel):
     text = models.TextField(
         verbose_name='Текст поста',
@@ -45,14 +65,36 @@ class Post(PubDateModel):
         upload_to='posts/',
         blank=True
     )
+    comments_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Число комментариев'
+    )
+
+    objects = PostQuerySet.as_manager()
 
     def __str__(self) -> str:
         return self.text[:COUNT_SYMBOL]
 
+    def save(self, *args, **kwargs):
+        # Счётчики в сигналах обновляются в одной транзакции с постом.
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
     class Meta:
-        ordering = ['-pub_date']
+        ordering = ['-pub_date', '-id']
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
+        indexes = [
+            models.Index(
+                fields=['author', '-pub_date', '-id'],
+                name='post_author_date_idx',
+            ),
+            models.Index(
+                fields=['group', '-pub_date', '-id'],
+                name='post_group_date_idx',
+            ),
+        ]
 
 
 class Comment(CreateModel):
@@ -77,9 +119,18 @@ class Comment(CreateModel):
     def __str__(self) -> str:
         return self.text
 
+    def save(self, *args, **kwargs):
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
     class Meta:
         ordering = ['-created']
         verbose_name_plural = 'Комментарии'
+        indexes = [
+            models.Index(
+                fields=['post', '-created'], name='comment_post_created_idx'
+            ),
+        ]
 
 
 class Follow(models.Model):
@@ -93,7 +144,57 @@ class Follow(models.Model):
         related_name='follower',
         on_delete=models.CASCADE,
     )
-    UniqueConstraint(fields=['user', 'author'], name='follow_unique')
 
     def __str__(self) -> str:
         return self.user
+
+    class Meta:
+        constraints = [
+            UniqueConstraint(fields=['user', 'author'], name='follow_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['author', 'user'], name='follow_author_idx'),
+        ]
+
+
+class TimelineEntry(models.Model):
+    user = models.ForeignKey(
+        User,
+        related_name='timeline',
+        on_delete=models.CASCADE,
+    )
+    post = models.ForeignKey(
+        Post,
+        related_name='timeline_entries',
+        on_delete=models.CASCADE,
+    )
+    pub_date = models.DateTimeField(verbose_name='Дата публикации поста')
+
+    class Meta:
+        ordering = ['-pub_date']
+        verbose_name_plural = 'Ленты подписок'
+        constraints = [
+            UniqueConstraint(fields=['user', 'post'], name='timeline_unique'),
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', '-pub_date', '-post'],
+                name='timeline_user_date_idx',
+            ),
+        ]
+
+
+class SearchTerm(models.Model):
+    term = models.CharField(max_length=64, verbose_name='Основа слова')
+    post = models.ForeignKey(
+        Post,
+        related_name='search_terms',
+        on_delete=models.CASCADE,
+    )
+    frequency = models.PositiveIntegerField(verbose_name='Число вхождений')
+
+    class Meta:
+        verbose_name_plural = 'Поисковый индекс'
+        indexes = [
+            models.Index(fields=['term', 'post'], name='search_term_idx'),
+        ]
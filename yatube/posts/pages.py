@@ -0,0 +1,95 @@
+"""Адреса страниц, которые показывают пост, группу или автора.
+
+Нужны для сброса кэша целых страниц (core.page_cache) из сигналов.
+"""
+from django.urls import NoReverseMatch, reverse
+
+from . import feeds, versions
+from .models import Group, Post, User
+
+
+def _pages(name, *args) -> set:
+    # Группа со slug, который не проходит по шаблону URL, страницы не имеет.
+    try:
+        return {reverse(name, args=args)}
+    except NoReverseMatch:
+        return set()
+
+
+def post_pages(post_id) -> set:
+    return {
+        reverse('posts:post_detail', args=(post_id,)),
+        reverse('posts:post_comments', args=(post_id,)),
+    }
+
+
+def profile_page(author_id) -> set:
+    username = User.objects.filter(pk=author_id).values_list(
+        'username', flat=True
+    ).first()
+    if username is None:
+        return set()
+    return _pages('posts:profile', username)
+
+
+def group_page(group_id) -> set:
+    slug = Group.objects.filter(pk=group_id).values_list(
+        'slug', flat=True
+    ).first()
+    if slug is None:
+        return set()
+    return _pages('posts:group_list', slug)
+
+
+def feed_pages(post) -> set:
+    """Страницы, на которых виден пост."""
+    pages = {reverse('posts:index')} | post_pages(post.pk)
+    pages |= profile_page(post.author_id)
+    if post.group_id:
+        pages |= group_page(post.group_id)
+    return pages
+
+
+def related_pages(posts) -> set:
+    """Главная и страницы постов, их авторов и групп."""
+    pages = {reverse('posts:index')}
+    author_ids = set()
+    group_ids = set()
+    for post_id, author_id, group_id in posts.values_list(
+        'id', 'author_id', 'group_id'
+    ):
+        pages |= post_pages(post_id)
+        author_ids.add(author_id)
+        group_ids.add(group_id)
+    for username in User.objects.filter(pk__in=author_ids).values_list(
+        'username', flat=True
+    ):
+        pages |= _pages('posts:profile', username)
+    for slug in Group.objects.filter(pk__in=group_ids).values_list(
+        'slug', flat=True
+    ):
+        pages |= _pages('posts:group_list', slug)
+    return pages
+
+
+def author_posts(author_id):
+    return Post.objects.filter(author_id=author_id).order_by()
+
+
+def group_posts(group_id):
+    return Post.objects.filter(group_id=group_id).order_by()
+
+
+def author_version(request, post_id) -> str:
+    """Поколение ленты автора для ключа страницы поста.
+
+    На странице поста видно число постов автора: новый пост меняет
+    поколение, и страницы остальных постов перестают находиться в кэше
+    без сброса каждой из них.
+    """
+    posts = feeds.get_posts([post_id])
+    if not posts:
+        return ''
+    return str(versions.get_version(
+        versions.author_scope(posts[0].author_id)
+    ))
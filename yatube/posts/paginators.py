@@ -0,0 +1,200 @@
+import base64
+import hashlib
+import json
+
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.paginator import InvalidPage, Page, Paginator
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+FEED_ORDERING = ('-pub_date', '-id')
+COMMENT_ORDERING = ('-created', '-id')
+APPROXIMATE_COUNT_TIMEOUT: int = 60
+PAGE_WINDOW: int = 2
+
+
+class InvalidCursor(InvalidPage):
+    pass
+
+
+def encode_cursor(values) -> str:
+    raw = json.dumps(
+        [value.isoformat() if hasattr(value, 'isoformat') else value
+         for value in values],
+        separators=(',', ':'),
+    )
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, fields) -> list:
+    try:
+        padding = '=' * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode((cursor + padding).encode())
+        values = json.loads(raw.decode())
+    except (TypeError, ValueError):
+        raise InvalidCursor('Некорректный курсор')
+    if not isinstance(values, list) or len(values) != len(fields):
+        raise InvalidCursor('Некорректный курсор')
+    try:
+        return [field.to_python(value) for field, value in zip(fields, values)]
+    except ValidationError:
+        raise InvalidCursor('Некорректный курсор')
+
+
+class WindowPaginator(Paginator):
+    """Нумерованные страницы с окном ссылок и счётчиком из кэша.
+
+    count(), если передан, заменяет COUNT(*) по object_list: ленты
+    берут число постов из posts.counters. Страница остаётся обычным
+    Page, номера ссылок лежат в её атрибуте window.
+    """
+
+    def __init__(self, object_list, per_page, count=None):
+        super().__init__(object_list, per_page)
+        self._count = count
+
+    @cached_property
+    def count(self):
+        if self._count is None:
+            return super().count
+        # Счётчик из кэша приблизителен и после гонок может уйти в минус.
+        return max(self._count(), 0)
+
+    def page(self, number):
+        # Страница не обрезается по приблизительному count: записи
+        # текущей страницы видны, даже если счётчик отстал.
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        page = Page(
+            self.object_list[bottom:bottom + self.per_page], number, self
+        )
+        page.window = self.window(number)
+        return page
+
+    def window(self, number) -> list:
+        """Номера страниц рядом с number, первая и последняя.
+
+        None на месте пропущенных страниц: шаблон рисует многоточие.
+        """
+        last = self.num_pages
+        numbers = sorted({1, last, *range(
+            max(number - PAGE_WINDOW, 1), min(number + PAGE_WINDOW, last) + 1
+        )})
+        window = []
+        previous = 0
+        for current in numbers:
+            if current - previous == 2:
+                window.append(current - 1)
+            elif current - previous > 2:
+                window.append(None)
+            window.append(current)
+            previous = current
+        return window
+
+
+class KeysetPage(Page):
+    is_keyset = True
+
+    def __init__(self, object_list, cursor, has_next, paginator):
+        super().__init__(object_list, None, paginator)
+        self.cursor = cursor
+        self._has_next = has_next
+
+    def __repr__(self):
+        return f'<Page after {self.cursor or "start"}>'
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self.cursor is not None
+
+    @cached_property
+    def next_cursor(self):
+        if not self._has_next or not self.object_list:
+            return None
+        return self.paginator.cursor_for(self.object_list[-1])
+
+
+class KeysetPaginator(Paginator):
+    """Пагинация по ключу (pub_date, id) вместо OFFSET.
+
+    Стоимость любой страницы одинакова: следующая страница выбирается
+    условием «строго после последней записи», а не пропуском строк.
+    Без ordering ключом служит явная сортировка queryset, а если её нет —
+    FEED_ORDERING. В ключ могут входить и аннотации queryset.
+    """
+
+    def __init__(self, object_list, per_page, ordering=None,
+                 approximate_count=False):
+        if ordering is None:
+            ordering = object_list.query.order_by or FEED_ORDERING
+        self.ordering = tuple(ordering)
+        self.approximate_count = approximate_count
+        super().__init__(object_list.order_by(*self.ordering), per_page)
+
+    @cached_property
+    def _keys(self):
+        """Пары (атрибут объекта, поле) для каждого столбца ключа."""
+        opts = self.object_list.model._meta
+        annotations = self.object_list.query.annotations
+        keys = []
+        for name in self.ordering:
+            name = name.lstrip('-')
+            if name in annotations:
+                keys.append((name, annotations[name].output_field))
+            else:
+                field = opts.pk if name == 'pk' else opts.get_field(name)
+                keys.append((field.attname, field))
+        return keys
+
+    @cached_property
+    def _fields(self):
+        return [field for _, field in self._keys]
+
+    @cached_property
+    def count(self):
+        if not self.approximate_count:
+            return super().count
+        sql, params = self.object_list.query.sql_with_params()
+        key = 'keyset_count:' + hashlib.md5(
+            f'{sql}{params}'.encode()
+        ).hexdigest()
+        count = cache.get(key)
+        if count is None:
+            count = super().count
+            cache.set(key, count, APPROXIMATE_COUNT_TIMEOUT)
+        return count
+
+    def cursor_for(self, obj) -> str:
+        return encode_cursor([getattr(obj, attr) for attr, _ in self._keys])
+
+    def _after(self, values):
+        condition = Q()
+        equal = {}
+        for name, (attr, _), value in zip(self.ordering, self._keys, values):
+            lookup = 'lt' if name.startswith('-') else 'gt'
+            condition |= Q(**equal, **{f'{attr}__{lookup}': value})
+            equal[attr] = value
+        return condition
+
+    def page(self, cursor=None):
+        queryset = self.object_list
+        if cursor:
+            queryset = queryset.filter(
+                self._after(decode_cursor(cursor, self._fields))
+            )
+        rows = list(queryset[:self.per_page + 1])
+        return KeysetPage(
+            rows[:self.per_page],
+            cursor or None,
+            len(rows) > self.per_page,
+            self,
+        )
+
+    def get_page(self, cursor=None):
+        try:
+            return self.page(cursor)
+        except InvalidCursor:
+            return self.page()
@@ -0,0 +1,209 @@
+"""Полнотекстовый поиск по постам.
+
+Текст поста разбивается на основы слов (posts.stemmer) и хранится
+в обратном индексе: в виртуальной таблице SQLite FTS5, если она
+доступна, иначе в таблице SearchTerm. Индекс обновляется сигналами
+при сохранении и удалении постов.
+"""
+import math
+from collections import defaultdict
+from functools import lru_cache
+from itertools import islice
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count
+
+from .models import Post, SearchTerm
+from .paginators import InvalidCursor, decode_cursor, encode_cursor
+from .stemmer import terms
+
+FTS_TABLE = 'posts_post_fts'
+MAX_RESULTS: int = 500
+
+
+@lru_cache(maxsize=None)
+def _fts5_ready(alias) -> bool:
+    if connection.vendor != 'sqlite':
+        return False
+    return FTS_TABLE in connection.introspection.table_names()
+
+
+def use_fts5() -> bool:
+    return (settings.SEARCH_BACKEND in ('auto', 'fts5')
+            and _fts5_ready(connection.alias))
+
+
+def index_post(post):
+    post_terms = terms(post.text)
+    if use_fts5():
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [post.pk]
+            )
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE} (rowid, terms) VALUES (%s, %s)',
+                [post.pk, ' '.join(post_terms.elements())],
+            )
+        return
+    SearchTerm.objects.filter(post_id=post.pk).delete()
+    SearchTerm.objects.bulk_create(
+        SearchTerm(term=term, post_id=post.pk, frequency=frequency)
+        for term, frequency in post_terms.items()
+    )
+
+
+def remove_post(post_id):
+    if use_fts5():
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [post_id]
+            )
+
+
+@transaction.atomic
+def rebuild(batch_size=1000):
+    # FTS5 намного быстрее принимает rowid по возрастанию.
+    posts = Post.objects.only('id', 'text').order_by('pk').iterator(
+        chunk_size=batch_size
+    )
+    if use_fts5():
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+            cursor.executemany(
+                f'INSERT INTO {FTS_TABLE} (rowid, terms) VALUES (%s, %s)',
+                ((post.pk, ' '.join(terms(post.text).elements()))
+                 for post in posts),
+            )
+        return
+    SearchTerm.objects.all().delete()
+    rows = (
+        SearchTerm(term=term, post_id=post.pk, frequency=frequency)
+        for post in posts for term, frequency in terms(post.text).items()
+    )
+    while True:
+        batch = list(islice(rows, batch_size))
+        if not batch:
+            break
+        SearchTerm.objects.bulk_create(batch)
+
+
+def _rank_fts5(query_terms):
+    match = ' AND '.join(f'"{term}"' for term in query_terms)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT rowid, bm25({FTS_TABLE}) FROM {FTS_TABLE} '
+            f'WHERE {FTS_TABLE} MATCH %s '
+            f'ORDER BY bm25({FTS_TABLE}), rowid DESC LIMIT %s',
+            [match, MAX_RESULTS],
+        )
+        return [(-score, post_id) for post_id, score in cursor.fetchall()]
+
+
+def _rank_python(query_terms):
+    """TF-IDF по таблице SearchTerm; пост должен содержать все термы."""
+    total = Post.objects.count() or 1
+    frequencies = dict(
+        SearchTerm.objects.filter(term__in=query_terms).values_list(
+            'term'
+        ).annotate(posts=Count('post_id')).order_by()
+    )
+    if len(frequencies) < len(query_terms):
+        return []
+    scores = defaultdict(float)
+    matched = defaultdict(int)
+    for post_id, term, frequency in SearchTerm.objects.filter(
+        term__in=query_terms
+    ).values_list('post_id', 'term', 'frequency').iterator():
+        idf = math.log(1 + total / frequencies[term])
+        scores[post_id] += (1 + math.log(frequency)) * idf
+        matched[post_id] += 1
+    ranked = sorted(
+        ((score, post_id) for post_id, score in scores.items()
+         if matched[post_id] == len(query_terms)),
+        reverse=True,
+    )
+    return ranked[:MAX_RESULTS]
+
+
+def rank(query):
+    """Список (релевантность, id поста) по убыванию релевантности."""
+    query_terms = sorted(terms(query))
+    if not query_terms:
+        return []
+    if use_fts5():
+        return _rank_fts5(query_terms)
+    return _rank_python(query_terms)
+
+
+def filter_posts(queryset, query):
+    """Посты queryset, содержащие все термы query, без MAX_RESULTS."""
+    query_terms = sorted(terms(query))
+    if not query_terms:
+        return queryset.none()
+    if use_fts5():
+        match = ' AND '.join(f'"{term}"' for term in query_terms)
+        return queryset.extra(
+            where=[f'{Post._meta.db_table}.id IN (SELECT rowid FROM '
+                   f'{FTS_TABLE} WHERE {FTS_TABLE} MATCH %s)'],
+            params=[match],
+        )
+    for term in query_terms:
+        queryset = queryset.filter(id__in=SearchTerm.objects.filter(
+            term=term
+        ).values('post_id'))
+    return queryset
+
+
+class SearchPage:
+    def __init__(self, posts, cursor, next_cursor):
+        self.object_list = posts
+        self.cursor = cursor
+        self.next_cursor = next_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class _Score:
+    @staticmethod
+    def to_python(value):
+        if not isinstance(value, (int, float)):
+            raise InvalidCursor('Некорректный курсор')
+        return value
+
+
+def search(query, cursor=None, per_page=10, queryset=None):
+    """Страница результатов поиска после курсора (релевантность, id)."""
+    ranked = rank(query)
+    if cursor:
+        try:
+            after = tuple(decode_cursor(cursor, (_Score, _Score)))
+        except InvalidCursor:
+            after, cursor = None, None
+        if after is not None:
+            ranked = [entry for entry in ranked if entry < after]
+    chunk = ranked[:per_page]
+    if queryset is None:
+        queryset = Post.objects.for_feed()
+    posts = queryset.in_bulk([post_id for _, post_id in chunk])
+    next_cursor = None
+    if len(ranked) > per_page:
+        next_cursor = encode_cursor(chunk[-1])
+    return SearchPage(
+        [posts[post_id] for _, post_id in chunk if post_id in posts],
+        cursor or None,
+        next_cursor,
+    )
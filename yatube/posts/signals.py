@@ -0,0 +1,357 @@
+"""Денормализованные данные и кэши, которые меняются вместе с моделями.
+
+Строки (счётчики в профиле, ленты подписок, поисковый индекс) пишутся
+в той же транзакции, что и модель. Кэш меняется только после коммита
+(after_commit): иначе читатель между сбросом и коммитом положил бы
+старые строки под новое поколение, а откат оставил бы кэш о данных,
+которых нет.
+"""
+from functools import partial
+
+from core import page_cache
+from core.signals import bulk_loaded
+from django.db import transaction
+from django.db.models.signals import (post_delete, post_save, pre_delete,
+                                      pre_save)
+from django.dispatch import receiver
+
+from . import (counters, feeds, follows, lookups, pages, search, timeline,
+               versions)
+from .models import Comment, Follow, Group, Post, User
+
+
+def after_commit(func, *args):
+    transaction.on_commit(partial(func, *args))
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, raw, **kwargs):
+    if created and not raw:
+        timeline.fan_out(instance)
+
+
+@receiver(post_save, sender=Follow)
+def follow_saved(sender, instance, created, raw, **kwargs):
+    if created and not raw:
+        timeline.follow(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    timeline.unfollow(instance.user_id, instance.author_id)
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def follow_graph_changed(sender, instance, raw=False, **kwargs):
+    if not raw:
+        after_commit(follows.refresh, instance.user_id)
+        after_commit(versions.bump, versions.follows_scope(instance.user_id))
+
+
+def author_username(post):
+    if Post.author.is_cached(post):
+        return post.author.username
+    return User.objects.filter(pk=post.author_id).values_list(
+        'username', flat=True
+    ).first()
+
+
+@receiver(post_save, sender=Post)
+def post_counted(sender, instance, created, raw, **kwargs):
+    if raw:
+        return
+    if created:
+        counters.change_posts_count(instance.author_id, 1)
+        after_commit(
+            counters.change_feed_counts, counters.feed_scopes(instance), 1
+        )
+        after_commit(lookups.forget, User, author_username(instance))
+        return
+    scopes = counters.feed_scopes(instance)
+    previous = getattr(instance, '_previous_feed_scopes', scopes)
+    after_commit(counters.change_feed_counts, previous - scopes, -1)
+    after_commit(counters.change_feed_counts, scopes - previous, 1)
+    previous_author_id = getattr(
+        instance, '_previous_author_id', instance.author_id
+    )
+    if previous_author_id != instance.author_id:
+        counters.change_posts_count(previous_author_id, -1)
+        counters.change_posts_count(instance.author_id, 1)
+        after_commit(
+            lookups.forget, User,
+            *User.objects.filter(
+                pk__in=(previous_author_id, instance.author_id)
+            ).values_list('username', flat=True),
+        )
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    counters.change_posts_count(instance.author_id, -1)
+    after_commit(
+        counters.change_feed_counts, counters.feed_scopes(instance), -1
+    )
+    username = author_username(instance)
+    if username is not None:
+        after_commit(lookups.forget, User, username)
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, created, raw, **kwargs):
+    if created and not raw:
+        counters.change_comments_count(instance.post_id, 1)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    counters.change_comments_count(instance.post_id, -1)
+
+
+@receiver(pre_save, sender=Post)
+def post_moving(sender, instance, raw, **kwargs):
+    instance._previous_scopes = set()
+    instance._previous_pages = set()
+    instance._previous_author_id = instance.author_id
+    if instance.pk and not raw:
+        previous = Post.objects.filter(pk=instance.pk).values(
+            'id', 'author_id', 'group_id'
+        ).first()
+        if previous:
+            instance._previous_author_id = previous['author_id']
+            instance._previous_scopes = versions.post_scopes(
+                Post(**previous)
+            )
+            instance._previous_pages = pages.feed_pages(Post(**previous))
+            instance._previous_feed_scopes = counters.feed_scopes(
+                Post(**previous)
+            )
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def post_changed(sender, instance, **kwargs):
+    scopes = versions.post_scopes(instance)
+    scopes |= getattr(instance, '_previous_scopes', set())
+    after_commit(versions.bump, *scopes)
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def comment_changed(sender, instance, **kwargs):
+    post = Post.objects.filter(pk=instance.post_id).only(
+        'author_id', 'group_id'
+    ).first()
+    if post is not None:
+        after_commit(versions.bump, *versions.post_scopes(post))
+
+
+def group_author_ids(group):
+    return set(Post.objects.filter(
+        group_id=group.pk
+    ).order_by().values_list('author_id', flat=True).distinct())
+
+
+@receiver(pre_delete, sender=Group)
+def group_deleting(sender, instance, **kwargs):
+    # После удаления группы у её постов уже group_id = NULL.
+    instance._author_ids = group_author_ids(instance)
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def group_changed(sender, instance, **kwargs):
+    author_ids = getattr(instance, '_author_ids', None)
+    if author_ids is None:
+        author_ids = group_author_ids(instance)
+    after_commit(
+        versions.bump,
+        versions.GLOBAL,
+        versions.group_scope(instance.pk),
+        *(versions.author_scope(pk) for pk in author_ids),
+    )
+
+
+@receiver(post_save, sender=User)
+def user_changed(sender, instance, created, update_fields, **kwargs):
+    if created or update_fields == frozenset({'last_login'}):
+        return
+    group_ids = Post.objects.filter(
+        author_id=instance.pk
+    ).order_by().values_list('group_id', flat=True).distinct()
+    after_commit(
+        versions.bump,
+        versions.GLOBAL,
+        versions.author_scope(instance.pk),
+        *(versions.group_scope(pk) for pk in group_ids if pk),
+    )
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def post_record_changed(sender, instance, **kwargs):
+    after_commit(feeds.forget_post, instance.pk)
+
+
+@receiver(post_save, sender=User)
+def author_record_changed(sender, instance, update_fields, **kwargs):
+    if update_fields != frozenset({'last_login'}):
+        after_commit(feeds.forget_author, instance.pk)
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def group_record_changed(sender, instance, **kwargs):
+    after_commit(feeds.forget_group, instance.pk)
+
+
+@receiver(pre_save, sender=Group)
+@receiver(pre_save, sender=User)
+def lookup_changing(sender, instance, raw=False, **kwargs):
+    field = sender.USERNAME_FIELD if sender is User else 'slug'
+    instance._previous_lookup = None
+    if instance.pk and not raw:
+        instance._previous_lookup = sender.objects.filter(
+            pk=instance.pk
+        ).values_list(field, flat=True).first()
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=Group)
+@receiver(post_delete, sender=User)
+def lookup_changed(sender, instance, update_fields=None, **kwargs):
+    if update_fields == frozenset({'last_login'}):
+        return
+    field = sender.USERNAME_FIELD if sender is User else 'slug'
+    previous = getattr(instance, '_previous_lookup', None)
+    after_commit(
+        lookups.forget,
+        sender, getattr(instance, field), *filter(None, [previous]),
+    )
+
+
+@receiver(post_save, sender=Post)
+def post_indexed(sender, instance, raw, **kwargs):
+    if not raw:
+        search.index_post(instance)
+
+
+@receiver(post_delete, sender=Post)
+def post_unindexed(sender, instance, **kwargs):
+    search.remove_post(instance.pk)
+
+
+@receiver(bulk_loaded)
+@transaction.atomic
+def bulk_rebuilt(sender, models, **kwargs):
+    if not {User, Group, Post, Comment, Follow} & set(models):
+        return
+    counters.reconcile()
+    after_commit(
+        lookups.forget, User, *User.objects.values_list('username', flat=True)
+    )
+    after_commit(
+        lookups.forget, Group, *Group.objects.values_list('slug', flat=True)
+    )
+    followed_ids = Follow.objects.order_by().values_list(
+        'author_id', flat=True
+    ).distinct()
+    for author_id in followed_ids:
+        timeline.reset_followers_count(author_id)
+    user_ids = Follow.objects.order_by().values_list(
+        'user_id', flat=True
+    ).distinct()
+    after_commit(follows.forget, *user_ids)
+    for user_id in user_ids:
+        timeline.rebuild(user_id)
+    search.rebuild()
+    group_ids = Group.objects.values_list('pk', flat=True)
+    author_ids = Post.objects.order_by().values_list(
+        'author_id', flat=True
+    ).distinct()
+    scopes = (
+        versions.GLOBAL,
+        *(versions.group_scope(pk) for pk in group_ids),
+        *(versions.author_scope(pk) for pk in author_ids),
+    )
+    after_commit(counters.forget_feed_counts, *scopes)
+    after_commit(
+        versions.bump,
+        *scopes, *(versions.follows_scope(pk) for pk in user_ids),
+    )
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def post_pages_changed(sender, instance, raw=False, **kwargs):
+    if not raw:
+        after_commit(
+            page_cache.purge,
+            *pages.feed_pages(instance),
+            *getattr(instance, '_previous_pages', ()),
+        )
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def comment_pages_changed(sender, instance, raw=False, **kwargs):
+    if not raw and instance.post_id:
+        after_commit(page_cache.purge, *pages.post_pages(instance.post_id))
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def follow_pages_changed(sender, instance, raw=False, **kwargs):
+    if not raw:
+        after_commit(
+            page_cache.purge, *pages.profile_page(instance.author_id)
+        )
+
+
+@receiver(pre_save, sender=Group)
+@receiver(pre_delete, sender=Group)
+def group_pages_changing(sender, instance, raw=False, **kwargs):
+    # Старый slug и посты группы нужны до переименования и до того,
+    # как удаление группы обнулит group_id у постов.
+    instance._previous_pages = set()
+    if instance.pk and not raw:
+        instance._previous_pages = pages.group_page(
+            instance.pk
+        ) | pages.related_pages(pages.group_posts(instance.pk))
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def group_pages_changed(sender, instance, raw=False, **kwargs):
+    if not raw:
+        after_commit(
+            page_cache.purge,
+            *pages.group_page(instance.pk),
+            *getattr(instance, '_previous_pages', ()),
+        )
+
+
+@receiver(pre_save, sender=User)
+def user_pages_changing(sender, instance, raw=False, **kwargs):
+    instance._previous_pages = set()
+    if instance.pk and not raw:
+        instance._previous_pages = pages.profile_page(instance.pk)
+
+
+@receiver(post_save, sender=User)
+def user_pages_changed(sender, instance, created, raw, update_fields,
+                       **kwargs):
+    if created or raw or update_fields == frozenset({'last_login'}):
+        return
+    after_commit(
+        page_cache.purge,
+        *instance._previous_pages,
+        *pages.profile_page(instance.pk),
+        *pages.related_pages(pages.author_posts(instance.pk)),
+    )
+
+
+@receiver(bulk_loaded)
+def bulk_pages_changed(sender, **kwargs):
+    after_commit(page_cache.purge_all)
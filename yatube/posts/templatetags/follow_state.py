@@ -0,0 +1,11 @@
+from django import template
+
+from posts import follows
+
+register = template.Library()
+
+
+@register.filter
+def followed_by(author_id, user):
+    """{% if post.author_id|followed_by:user %} — без запросов к БД."""
+    return follows.is_following(user, author_id)
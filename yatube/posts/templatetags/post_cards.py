@@ -0,0 +1,58 @@
+import hashlib
+
+from django import template
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from posts import versions
+
+CARD_KEY = 'post_card:{}:{}:{}:{}'
+register = template.Library()
+
+
+def _fingerprint(*values) -> str:
+    return hashlib.md5('|'.join(map(str, values)).encode()).hexdigest()[:12]
+
+
+def card_key(post, post_versions) -> str:
+    """Ключ карточки: поколение поста и то, что видно об авторе и группе.
+
+    Имя автора и slug группы уже загружены вместе с постом, поэтому
+    вместо поколений автора и группы в ключ входит отпечаток этих
+    полей: переименование меняет ключ, новые посты автора — нет.
+    """
+    author = post.author
+    group = post.group
+    return CARD_KEY.format(
+        post.pk,
+        post_versions[versions.post_scope(post.pk)],
+        _fingerprint(author.username, author.first_name, author.last_name),
+        _fingerprint(group.slug) if group else '-',
+    )
+
+
+@register.simple_tag
+def post_cards(posts):
+    """HTML карточек posts/includes/post_card.html в порядке posts.
+
+    Готовые карточки берутся из кэша одним get_many, поэтому одна
+    карточка рендерится один раз для всех лент и страниц.
+    """
+    posts = list(posts)
+    post_versions = versions.get_versions(
+        *(versions.post_scope(post.pk) for post in posts)
+    )
+    keys = [card_key(post, post_versions) for post in posts]
+    cards = cache.get_many(keys)
+    missing = {}
+    for key, post in zip(keys, posts):
+        if key not in cards:
+            missing[key] = render_to_string(
+                'posts/includes/post_card.html', {'post': post}
+            )
+    if missing:
+        cache.set_many(missing, settings.FEED_CACHE_TIMEOUT)
+        cards.update(missing)
+    return [mark_safe(cards[key]) for key in keys]
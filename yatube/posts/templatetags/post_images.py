@@ -0,0 +1,27 @@
+import logging
+
+from django import template
+
+from posts import thumbnails
+
+logger = logging.getLogger(__name__)
+register = template.Library()
+
+
+@register.simple_tag
+def post_thumbnail(image):
+    """Готовая миниатюра картинки поста.
+
+    Если миниатюры ещё нет, тег возвращает None и шаблон показывает
+    исходную картинку. Миниатюры создаются после загрузки картинки
+    и командой pregenerate_thumbnails, но не из рендеринга: фоновый
+    поток не должен писать в MEDIA_ROOT после ответа.
+    """
+    if not image:
+        return None
+    try:
+        thumbnail = thumbnails.cached(image)
+    except Exception:
+        logger.exception('Не удалось получить миниатюру %s', image)
+        return None
+    return thumbnail
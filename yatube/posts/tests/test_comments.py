@@ -0,0 +1,53 @@
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase
+from django.urls import reverse
+from posts.models import Comment, Post
+from posts.views import NUMBER_OF_COMMENTS
+
+User = get_user_model()
+
+
+class CommentPaginationTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.post = Post.objects.create(author=cls.user, text='Пост')
+        cls.comments = [
+            Comment.objects.create(
+                post=cls.post, author=cls.user, text=f'Комментарий {i}'
+            )
+            for i in range(NUMBER_OF_COMMENTS + 3)
+        ]
+
+    def setUp(self):
+        self.guest_client = Client()
+
+    def test_post_detail_shows_first_page(self):
+        """На странице поста только первая страница комментариев"""
+        response = self.guest_client.get(
+            reverse('posts:post_detail', args=(self.post.id,))
+        )
+        comments = response.context['comments']
+        self.assertEqual(
+            list(comments), self.comments[::-1][:NUMBER_OF_COMMENTS]
+        )
+        self.assertTrue(comments.has_next())
+        self.assertContains(response, comments.next_cursor)
+
+    def test_fragment_endpoint_returns_next_page(self):
+        """JSON-фрагмент отдаёт следующую страницу по курсору"""
+        url = reverse('posts:post_comments', args=(self.post.id,))
+        first = self.guest_client.get(url).json()
+        response = self.guest_client.get(url, {'after': first['next']})
+        data = response.json()
+        self.assertIsNone(data['next'])
+        self.assertIn('Комментарий 0<', data['html'].replace('\n', '<'))
+        self.assertNotIn(f'Комментарий {NUMBER_OF_COMMENTS}<', data['html'])
+
+    def test_fragment_endpoint_unknown_post(self):
+        """Комментарии несуществующего поста — 404"""
+        response = self.guest_client.get(
+            reverse('posts:post_comments', args=(self.post.id + 1,))
+        )
+        self.assertEqual(response.status_code, 404)
@@ -0,0 +1,89 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+from posts.models import Comment, Follow, Group, Post
+
+from .utils import OnCommitMixin
+
+User = get_user_model()
+
+
+class ConditionalGetTests(OnCommitMixin, TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.author = User.objects.create_user(username='writer')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        cls.post = Post.objects.create(
+            author=cls.author, group=cls.group, text='Пост'
+        )
+        Follow.objects.create(user=cls.user, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+        self.urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', args=(self.group.slug,)),
+            reverse('posts:profile', args=(self.author.username,)),
+            reverse('posts:post_detail', args=(self.post.id,)),
+            reverse('posts:follow_index'),
+        )
+
+    def get(self, url):
+        # Первый ответ выдаёт CSRF-cookie, которая входит в ETag.
+        self.authorized_client.get(url)
+        return self.authorized_client.get(url)
+
+    def test_unchanged_page_gets_304(self):
+        """Страница без изменений отдаёт 304 по ETag и Last-Modified"""
+        for url in self.urls:
+            with self.subTest(url=url):
+                response = self.get(url)
+                self.assertTrue(response.has_header('Last-Modified'))
+                revalidated = self.authorized_client.get(
+                    url, HTTP_IF_NONE_MATCH=response['ETag']
+                )
+                self.assertEqual(revalidated.status_code, 304)
+                self.assertIsNone(revalidated.context)
+                revalidated = self.authorized_client.get(
+                    url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified']
+                )
+                self.assertEqual(revalidated.status_code, 304)
+
+    def test_changes_refresh_validators(self):
+        """Новый пост, комментарий и подписка меняют ETag страниц"""
+        changes = (
+            (lambda: Post.objects.create(
+                author=self.author, group=self.group, text='Новый'
+            ), self.urls),
+            (lambda: Comment.objects.create(
+                post=self.post, author=self.user, text='Комментарий'
+            ), self.urls[3:4]),
+            (lambda: Follow.objects.filter(user=self.user).delete(),
+             self.urls[2:]),
+        )
+        for change, urls in changes:
+            etags = {url: self.get(url)['ETag'] for url in urls}
+            with self.captureOnCommitCallbacks(execute=True):
+                change()
+            for url in urls:
+                with self.subTest(url=url):
+                    response = self.authorized_client.get(
+                        url, HTTP_IF_NONE_MATCH=etags[url]
+                    )
+                    self.assertEqual(response.status_code, 200)
+
+    def test_validators_are_per_viewer(self):
+        """ETag другого пользователя не подходит"""
+        url = reverse('posts:index')
+        etag = self.authorized_client.get(url)['ETag']
+        other_client = Client()
+        other_client.force_login(self.author)
+        response = other_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
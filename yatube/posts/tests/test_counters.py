@@ -0,0 +1,105 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from posts import lookups
+from posts.models import Comment, Post
+from users.models import Profile
+
+from .utils import OnCommitMixin
+
+User = get_user_model()
+
+
+class CountersTests(OnCommitMixin, TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+
+    def posts_count(self):
+        return Profile.objects.get(user=self.user).posts_count
+
+    def test_posts_count(self):
+        """Число постов автора меняется при создании и удалении поста"""
+        post = Post.objects.create(author=self.user, text='Пост')
+        Post.objects.create(author=self.user, text='Пост')
+        self.assertEqual(self.posts_count(), 2)
+        post.delete()
+        self.assertEqual(self.posts_count(), 1)
+
+    def test_posts_count_follows_author_change(self):
+        """Пост, переданный другому автору, переходит в его счётчик"""
+        other = User.objects.create_user(username='other')
+        post = Post.objects.create(author=self.user, text='Пост')
+        self.assertEqual(lookups.user_by_username('auth').posts_count, 1)
+        self.assertEqual(lookups.user_by_username('other').posts_count, 0)
+        post.author = other
+        with self.captureOnCommitCallbacks(execute=True):
+            post.save()
+        self.assertEqual(self.posts_count(), 0)
+        self.assertEqual(Profile.objects.get(user=other).posts_count, 1)
+        self.assertEqual(lookups.user_by_username('auth').posts_count, 0)
+        self.assertEqual(lookups.user_by_username('other').posts_count, 1)
+
+    def test_comments_count(self):
+        """Число комментариев поста меняется вместе с комментариями"""
+        post = Post.objects.create(author=self.user, text='Пост')
+        comment = Comment.objects.create(
+            post=post, author=self.user, text='Комментарий'
+        )
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+        comment.delete()
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 0)
+
+    def test_reconcile_counters(self):
+        """Команда исправляет разошедшиеся счётчики"""
+        post = Post.objects.create(author=self.user, text='Пост')
+        Comment.objects.create(post=post, author=self.user, text='-')
+        Profile.objects.filter(user=self.user).update(posts_count=10)
+        Post.objects.filter(pk=post.pk).update(comments_count=5)
+        out = StringIO()
+        call_command('reconcile_counters', stdout=out)
+        post.refresh_from_db()
+        self.assertEqual(self.posts_count(), 1)
+        self.assertEqual(post.comments_count, 1)
+        self.assertIn('2', out.getvalue())
+
+    def test_post_page_without_profile(self):
+        """Страница поста автора без профиля открывается"""
+        post = Post.objects.create(author=self.user, text='Пост')
+        Profile.objects.filter(user=self.user).delete()
+        response = self.client.get(
+            reverse('posts:post_detail', args=(post.id,))
+        )
+        self.assertEqual(response.context['posts_count'], 1)
+        self.assertEqual(self.posts_count(), 1)
+
+    def test_loaddata_reconciles_counters(self):
+        """После loaddata есть профили и верные счётчики"""
+        fixture = [
+            {'model': 'auth.user', 'pk': 100,
+             'fields': {'username': 'loaded', 'password': ''}},
+            {'model': 'posts.post', 'pk': 100,
+             'fields': {'text': 'Пост', 'author': 100,
+                        'pub_date': '2021-01-01T00:00:00Z'}},
+            {'model': 'posts.comment', 'pk': 100,
+             'fields': {'text': 'Комментарий', 'author': 100, 'post': 100,
+                        'created': '2021-01-01T00:00:00Z'}},
+        ]
+        descriptor, path = tempfile.mkstemp(suffix='.json')
+        with os.fdopen(descriptor, 'w') as file:
+            json.dump(fixture, file)
+        self.addCleanup(os.unlink, path)
+        call_command('loaddata', path, verbosity=0)
+        response = self.client.get(reverse('posts:post_detail', args=(100,)))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['posts_count'], 1)
+        self.assertEqual(response.context['post_user'].comments_count, 1)
@@ -0,0 +1,91 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from posts import counters, feeds, follows, lookups, versions
+from posts.models import Group, Post
+
+from .utils import OnCommitMixin
+
+User = get_user_model()
+
+
+class FeedCacheTests(OnCommitMixin, TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(title='Группа', slug='group')
+        cls.posts = [
+            Post.objects.create(
+                author=cls.user, group=cls.group, text=f'Пост {i}'
+            )
+            for i in range(3)
+        ]
+
+    def setUp(self):
+        cache.clear()
+
+    def paginator(self):
+        return feeds.FeedPaginator(
+            Post.objects.for_feed(), 2, lambda: len(self.posts),
+            versions.get_versions(versions.GLOBAL),
+        )
+
+    def test_page_ids_are_cached(self):
+        """Повторная страница ленты собирается из кэша без запросов"""
+        first = self.paginator().page(1)
+        with self.assertNumQueries(0):
+            second = self.paginator().page(1)
+        self.assertEqual(list(second), list(first))
+        self.assertEqual(second[0].author.username, 'auth')
+        self.assertEqual(second[0].group.slug, 'group')
+
+    def test_records_bypass_process_cache(self):
+        """Записи, которые сбрасываются на месте, не живут в кэше процесса"""
+        for key in (
+            feeds.POST_KEY, feeds.AUTHOR_KEY, feeds.GROUP_KEY,
+            lookups.LOOKUP_KEY, counters.FEED_COUNT_KEY,
+            follows.FOLLOWING_KEY, versions.VERSION_KEY,
+        ):
+            self.assertTrue(key.format(1, 1).startswith(
+                settings.CACHE_LOCAL_EXCLUDE_PREFIXES
+            ), key)
+
+    def test_edited_post_is_read_again(self):
+        """Правка поста сбрасывает только его запись"""
+        ids = [post.pk for post in self.posts]
+        feeds.get_posts(ids)
+        post = self.posts[0]
+        post.text = 'Исправлено'
+        with self.captureOnCommitCallbacks(execute=True):
+            post.save()
+        with self.assertNumQueries(1):
+            posts = feeds.get_posts(ids)
+        self.assertEqual(posts[0].text, 'Исправлено')
+        self.assertEqual([post.pk for post in posts], ids)
+        group = Group.objects.get(pk=self.group.pk)
+        group.slug = 'renamed'
+        with self.captureOnCommitCallbacks(execute=True):
+            group.save()
+        with self.assertNumQueries(1):
+            posts = feeds.get_posts(ids)
+        self.assertEqual(posts[1].group.slug, 'renamed')
+
+    def test_deleted_post_is_skipped(self):
+        """Удалённый пост пропадает со страницы из кэша"""
+        ids = [post.pk for post in self.posts]
+        feeds.get_posts(ids)
+        with self.captureOnCommitCallbacks(execute=True):
+            Post.objects.filter(pk=ids[1]).delete()
+        self.assertEqual(
+            [post.pk for post in feeds.get_posts(ids)], [ids[0], ids[2]]
+        )
+
+    def test_versions_change_after_commit(self):
+        """Поколение ленты меняется только после коммита поста"""
+        version = versions.get_version(versions.GLOBAL)
+        with self.captureOnCommitCallbacks(execute=True):
+            Post.objects.create(author=self.user, text='Новый')
+            self.assertEqual(versions.get_version(versions.GLOBAL), version)
+        self.assertGreater(versions.get_version(versions.GLOBAL), version)
@@ -0,0 +1,78 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.test import Client, TestCase
+from django.urls import reverse
+from posts import follows
+from posts.models import Follow
+
+from .utils import OnCommitMixin
+
+User = get_user_model()
+
+
+class FollowGraphTests(OnCommitMixin, TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='reader')
+        cls.other = User.objects.create_user(username='other')
+        cls.author = User.objects.create_user(username='writer')
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def fresh_user(self):
+        return User.objects.get(pk=self.user.pk)
+
+    def test_profile_follow_state_is_per_viewer(self):
+        """Кнопка подписки зависит от подписок смотрящего, а не автора"""
+        Follow.objects.create(user=self.other, author=self.author)
+        url = reverse('posts:profile', args=(self.author.username,))
+        unfollow_url = reverse(
+            'posts:profile_unfollow', args=(self.author.username,)
+        )
+        response = self.authorized_client.get(url)
+        self.assertNotContains(response, unfollow_url)
+        with self.captureOnCommitCallbacks(execute=True):
+            Follow.objects.create(user=self.user, author=self.author)
+        response = self.authorized_client.get(url)
+        self.assertContains(response, unfollow_url)
+
+    def test_warm_lookup_makes_no_queries(self):
+        """Проверка подписки на тёплом кэше обходится без БД"""
+        with self.captureOnCommitCallbacks(execute=True):
+            Follow.objects.create(user=self.user, author=self.author)
+        user = self.fresh_user()
+        with self.assertNumQueries(0):
+            self.assertTrue(follows.is_following(user, self.author.pk))
+            self.assertFalse(follows.is_following(user, self.other.pk))
+
+    def test_unfollow_writes_through(self):
+        """Отписка сразу обновляет массив в кэше"""
+        with self.captureOnCommitCallbacks(execute=True):
+            Follow.objects.create(user=self.user, author=self.author)
+            self.authorized_client.get(reverse(
+                'posts:profile_unfollow', args=(self.author.username,)
+            ))
+        user = self.fresh_user()
+        with self.assertNumQueries(0):
+            self.assertFalse(follows.is_following(user, self.author.pk))
+
+    def test_rolled_back_follow_leaves_cache(self):
+        """Откаченная подписка не попадает в кэш подписок"""
+        user = self.fresh_user()
+        self.assertFalse(follows.is_following(user, self.author.pk))
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            try:
+                with transaction.atomic():
+                    Follow.objects.create(user=self.user, author=self.author)
+                    raise ValueError
+            except ValueError:
+                pass
+        self.assertEqual(callbacks, [])
+        user = self.fresh_user()
+        with self.assertNumQueries(0):
+            self.assertFalse(follows.is_following(user, self.author.pk))
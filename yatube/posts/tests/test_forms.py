@@ -4,18 +4,21 @@ from http import HTTPStatus
 
 from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import Client, TestCase, override_settings
 from django.urls import reverse
 from posts.forms import CommentForm, PostForm
 from posts.models import Comment, Follow, Group, Post
 
+from .utils import OnCommitMixin
+
 User = get_user_model()
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
 
 
 @override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
-class PostCreateFormTests(TestCase):
+class PostCreateFormTests(OnCommitMixin, TestCase):
     @classmethod
     def setUpClass(cls):
         super().setUpClass()
@@ -86,6 +89,7 @@ class PostCreateFormTests(TestCase):
         shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
 
     def setUp(self):
+        cache.clear()
         self.guest_client = Client()
         self.authorized_client = Client()
         self.authorized_client.force_login(self.user)
@@ -260,12 +264,35 @@ class PostCreateFormTests(TestCase):
         )
 
     def test_cache_index(self):
-        """Данные сохраняются в кэше"""
+        """Данные сохраняются в кэше до изменения ленты"""
         response_first = self.authorized_client.get(
             reverse(self.index_url[0])
         )
-        self.post.delete()
+        Post.objects.filter(pk=self.post.pk).update(text='Без сигналов')
         response_second = self.authorized_client.get(
             reverse(self.index_url[0])
         )
         self.assertEqual(response_first.content, response_second.content)
+
+    def test_cache_invalidated_on_change(self):
+        """Изменение поста сразу сбрасывает кэш лент"""
+        urls = (
+            reverse(self.index_url[0]),
+            reverse(self.group_list_url[0], args=(self.group_list_url[2],)),
+            reverse(self.profile_url[0], args=(self.profile_url[2],)),
+        )
+        for url in urls:
+            self.authorized_client.get(url)
+        self.post.text = 'Отредактированный пост'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.post.save()
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.authorized_client.get(url)
+                self.assertContains(response, 'Отредактированный пост')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.post.delete()
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.authorized_client.get(url)
+                self.assertNotContains(response, 'Отредактированный пост')
@@ -0,0 +1,64 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+from posts import lookups
+from posts.models import Group, Post
+
+from .utils import OnCommitMixin
+
+User = get_user_model()
+
+
+class LookupCacheTests(OnCommitMixin, TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(title='Группа', slug='group')
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+
+    def test_found_objects_are_cached(self):
+        """Группа и пользователь находятся без повторных запросов"""
+        lookups.group_by_slug('group')
+        lookups.user_by_username('auth')
+        with self.assertNumQueries(0):
+            self.assertEqual(lookups.group_by_slug('group'), self.group)
+            self.assertEqual(lookups.user_by_username('auth'), self.user)
+            self.assertEqual(lookups.group_by_slug('group').title, 'Группа')
+
+    def test_user_record_keeps_posts_count(self):
+        """Число постов автора берётся из записи и меняется вместе с постами"""
+        self.assertEqual(lookups.user_by_username('auth').posts_count, 0)
+        with self.captureOnCommitCallbacks(execute=True):
+            post = Post.objects.create(author=self.user, text='Пост')
+        with self.assertNumQueries(1):
+            self.assertEqual(lookups.user_by_username('auth').posts_count, 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            post.delete()
+        self.assertEqual(lookups.user_by_username('auth').posts_count, 0)
+
+    def test_missing_objects_are_cached(self):
+        """Несуществующий адрес отвечает 404 без запросов к базе"""
+        url = reverse('posts:profile', args=('nobody',))
+        self.assertEqual(self.guest_client.get(url).status_code, 404)
+        with self.assertNumQueries(0):
+            response = self.guest_client.get(url)
+        self.assertEqual(response.status_code, 404)
+        with self.captureOnCommitCallbacks(execute=True):
+            User.objects.create_user(username='nobody')
+        self.assertEqual(self.guest_client.get(url).status_code, 200)
+
+    def test_renamed_group_is_forgotten(self):
+        """Переименование группы сбрасывает старый и новый slug"""
+        lookups.group_by_slug('group')
+        lookups.group_by_slug('renamed')
+        group = Group.objects.get(pk=self.group.pk)
+        group.slug = 'renamed'
+        with self.captureOnCommitCallbacks(execute=True):
+            group.save()
+        self.assertIsNone(lookups.group_by_slug('group'))
+        self.assertEqual(lookups.group_by_slug('renamed'), self.group)
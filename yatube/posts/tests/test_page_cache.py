@@ -0,0 +1,191 @@
+import hashlib
+
+from core import page_cache
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from posts.models import Comment, Follow, Group, Post
+
+from .utils import OnCommitMixin
+
+User = get_user_model()
+
+
+class AnonymousPageCacheTests(OnCommitMixin, TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        cls.post = Post.objects.create(
+            author=cls.user, group=cls.group, text='Пост'
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+        self.urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', args=(self.group.slug,)),
+            reverse('posts:profile', args=(self.user.username,)),
+            reverse('posts:post_detail', args=(self.post.id,)),
+        )
+
+    def test_repeated_request_served_from_cache(self):
+        """Повторный анонимный запрос не вызывает view"""
+        for url in self.urls:
+            with self.subTest(url=url):
+                first = self.guest_client.get(url)
+                with self.assertNumQueries(0):
+                    second = self.guest_client.get(url)
+                self.assertIsNone(second.context)
+                self.assertEqual(second.content, first.content)
+                self.assertEqual(second['ETag'], first['ETag'])
+
+    def test_conditional_request_gets_304(self):
+        """Запрос с If-None-Match получает 304"""
+        url = reverse('posts:index')
+        etag = self.guest_client.get(url)['ETag']
+        response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_changes_purge_affected_pages(self):
+        """Пост, комментарий и группа сбрасывают свои страницы"""
+        changes = (
+            (lambda: Post.objects.create(
+                author=self.user, group=self.group, text='Новый'
+            ), self.urls[:3]),
+            (lambda: Comment.objects.create(
+                post=self.post, author=self.user, text='Комментарий'
+            ), self.urls[3:]),
+            (lambda: Group.objects.filter(pk=self.group.pk).first().save(),
+             self.urls),
+        )
+        for change, urls in changes:
+            for url in urls:
+                self.guest_client.get(url)
+            with self.captureOnCommitCallbacks(execute=True):
+                change()
+            for url in urls:
+                with self.subTest(url=url):
+                    self.assertIsNotNone(self.guest_client.get(url).context)
+
+    def test_new_post_refreshes_author_post_pages(self):
+        """Новый пост меняет число постов на страницах других постов
+        автора, не сбрасывая их по одной
+        """
+        url = self.urls[3]
+        version_key = page_cache.PATH_VERSION_KEY.format(
+            hashlib.md5(url.encode()).hexdigest()
+        )
+        self.guest_client.get(url)
+        version = cache.get(version_key)
+        with self.captureOnCommitCallbacks(execute=True):
+            other = Post.objects.create(author=self.user, text='Другой')
+        response = self.guest_client.get(url)
+        self.assertEqual(response.context['posts_count'], 2)
+        self.assertEqual(cache.get(version_key), version)
+        with self.captureOnCommitCallbacks(execute=True):
+            other.delete()
+        response = self.guest_client.get(url)
+        self.assertEqual(response.context['posts_count'], 1)
+
+    def test_other_paths_leave_no_versions(self):
+        """404, статика и некэшируемые view не заводят поколений"""
+        paths = (
+            '/no-such-page/', '/static/css/bootstrap.min.css',
+            reverse('posts:search'),
+        )
+        for path in paths:
+            with self.subTest(path=path):
+                self.guest_client.get(path)
+                self.assertIsNone(cache.get(page_cache.PATH_VERSION_KEY.format(
+                    hashlib.md5(path.encode()).hexdigest()
+                )))
+
+    @override_settings(ANONYMOUS_PAGE_CACHE_TIMEOUT=0)
+    def test_cache_can_be_disabled(self):
+        """ANONYMOUS_PAGE_CACHE_TIMEOUT = 0 выключает кэш страниц"""
+        url = reverse('posts:index')
+        self.guest_client.get(url)
+        self.assertIsNotNone(self.guest_client.get(url).context)
+
+
+class UserPageCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='writer')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.post = Post.objects.create(author=cls.author, text='Пост')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+        self.profile_url = reverse(
+            'posts:profile', args=(self.author.username,)
+        )
+        self.detail_url = reverse('posts:post_detail', args=(self.post.id,))
+
+    def test_page_is_shared_between_users(self):
+        """Заготовку, собранную для одного пользователя, получает другой"""
+        for url in (reverse('posts:index'), self.profile_url,
+                    self.detail_url):
+            with self.subTest(url=url):
+                self.author_client.get(url)
+                response = self.reader_client.get(url)
+                self.assertTemplateNotUsed(response, 'base.html')
+                self.assertContains(response, 'Пользователь: reader')
+                self.assertNotContains(response, 'Пользователь: writer')
+                self.assertNotContains(response, '<!--hole:')
+
+    def test_personal_fragments_are_filled_per_user(self):
+        """Кнопки подписки, правка и CSRF-токен — свои у каждого"""
+        edit_url = reverse('posts:post_edit', args=(self.post.id,))
+        unfollow_url = reverse(
+            'posts:profile_unfollow', args=(self.author.username,)
+        )
+        self.author_client.get(self.profile_url)
+        self.author_client.get(self.detail_url)
+        response = self.reader_client.get(self.profile_url)
+        self.assertContains(response, unfollow_url)
+        self.assertNotContains(response, 'Это Ваши посты')
+        response = self.reader_client.get(self.detail_url)
+        self.assertTemplateNotUsed(response, 'base.html')
+        self.assertContains(response, unfollow_url)
+        self.assertNotContains(response, edit_url)
+        self.assertContains(response, 'csrfmiddlewaretoken')
+        response = self.author_client.get(self.detail_url)
+        self.assertContains(response, edit_url)
+        self.assertNotContains(response, unfollow_url)
+
+    def test_conditional_request_skips_fragments(self):
+        """Запрос с If-None-Match получает 304, не рендеря фрагменты"""
+        self.reader_client.get(self.detail_url)
+        etag = self.reader_client.get(self.detail_url)['ETag']
+        response = self.reader_client.get(
+            self.detail_url, HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, 304)
+        self.assertIsNone(response.context)
+        response = self.author_client.get(
+            self.detail_url, HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, 200)
+
+    @override_settings(USER_PAGE_CACHE_TIMEOUT=0)
+    def test_cache_can_be_disabled(self):
+        """USER_PAGE_CACHE_TIMEOUT = 0 выключает кэш для пользователей"""
+        self.reader_client.get(self.profile_url)
+        response = self.reader_client.get(self.profile_url)
+        self.assertTemplateUsed(response, 'base.html')
+        self.assertContains(response, 'Пользователь: reader')
@@ -0,0 +1,131 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from posts import counters, timeline, versions
+from posts.models import Follow, Group, Post
+from posts.paginators import KeysetPage, KeysetPaginator, WindowPaginator
+from posts.views import NUMBER_OF_POSTS
+
+from .utils import OnCommitMixin
+
+User = get_user_model()
+
+
+class KeysetPaginatorTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        Post.objects.bulk_create(
+            Post(author=cls.user, text=f'Пост {i}')
+            for i in range(NUMBER_OF_POSTS + 3)
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+
+    def test_pages_follow_each_other(self):
+        """Курсор ведёт на следующие записи без пропусков и повторов"""
+        paginator = KeysetPaginator(Post.objects.all(), NUMBER_OF_POSTS)
+        first_page = paginator.page()
+        second_page = paginator.page(first_page.next_cursor)
+        expected = list(Post.objects.order_by('-pub_date', '-id'))
+        self.assertEqual(
+            list(first_page) + list(second_page), expected
+        )
+        self.assertTrue(first_page.has_next())
+        self.assertFalse(second_page.has_next())
+        self.assertTrue(second_page.has_previous())
+
+    def test_invalid_cursor_returns_first_page(self):
+        """Некорректный курсор возвращает первую страницу"""
+        paginator = KeysetPaginator(Post.objects.all(), NUMBER_OF_POSTS)
+        page = paginator.get_page('не-курсор')
+        self.assertFalse(page.has_previous())
+        self.assertEqual(len(page), NUMBER_OF_POSTS)
+
+    @override_settings(POSTS_KEYSET_PAGINATION=True)
+    def test_index_uses_keyset_pagination(self):
+        """Главная страница переключается на курсоры настройкой"""
+        response = self.guest_client.get(reverse('posts:index'))
+        page_obj = response.context['page_obj']
+        self.assertIsInstance(page_obj, KeysetPage)
+        self.assertContains(response, f'?after={page_obj.next_cursor}')
+        response = self.guest_client.get(
+            reverse('posts:index'), {'after': page_obj.next_cursor}
+        )
+        self.assertEqual(len(response.context['page_obj']), 3)
+
+
+class WindowPaginatorTests(OnCommitMixin, TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(title='Группа', slug='group')
+        Post.objects.bulk_create(
+            Post(author=cls.user, text=f'Пост {i}')
+            for i in range(NUMBER_OF_POSTS * 12)
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+
+    def test_window(self):
+        """Ссылки только на соседние, первую и последнюю страницы"""
+        paginator = WindowPaginator(Post.objects.all(), NUMBER_OF_POSTS)
+        self.assertEqual(paginator.page(1).window, [1, 2, 3, None, 12])
+        self.assertEqual(
+            paginator.page(4).window, [1, 2, 3, 4, 5, 6, None, 12]
+        )
+        self.assertEqual(
+            paginator.page(8).window, [1, None, 6, 7, 8, 9, 10, 11, 12]
+        )
+
+    def test_page_links_are_bounded(self):
+        """Страница ленты не перечисляет все страницы"""
+        response = self.guest_client.get(reverse('posts:index'), {'page': 6})
+        self.assertContains(response, 'class="page-link"', count=13)
+        self.assertNotContains(response, '?page=2"')
+
+    def test_feed_counts_are_incremented(self):
+        """Число постов ленты меняется без повторного COUNT(*)"""
+        scope = versions.group_scope(self.group.pk)
+        count = Post.objects.filter(group=self.group).count
+        self.assertEqual(
+            counters.feed_count(versions.GLOBAL, Post.objects.count), 120
+        )
+        self.assertEqual(counters.feed_count(scope, count), 0)
+        with self.captureOnCommitCallbacks(execute=True):
+            post = Post.objects.create(
+                author=self.user, text='Новый', group=self.group
+            )
+        with CaptureQueriesContext(connection) as context:
+            self.assertEqual(counters.feed_count(versions.GLOBAL, None), 121)
+            self.assertEqual(counters.feed_count(scope, None), 1)
+        self.assertEqual(len(context.captured_queries), 0)
+        post.group = None
+        with self.captureOnCommitCallbacks(execute=True):
+            post.save()
+        self.assertEqual(counters.feed_count(scope, None), 0)
+        with self.captureOnCommitCallbacks(execute=True):
+            post.delete()
+        self.assertEqual(counters.feed_count(versions.GLOBAL, None), 120)
+
+    @override_settings(TIMELINE_MAX_LENGTH=2)
+    def test_follow_feed_count_matches_timeline(self):
+        """Число постов ленты подписок совпадает с её строками"""
+        reader = User.objects.create_user(username='reader')
+        Follow.objects.create(user=reader, author=self.user)
+        for i in range(5):
+            Post.objects.create(author=self.user, text=f'Новый {i}')
+        self.assertEqual(
+            counters.follow_feed_count(reader),
+            timeline.feed(reader).count(),
+        )
+        self.assertEqual(reader.timeline.count(), 2)
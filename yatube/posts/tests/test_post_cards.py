@@ -0,0 +1,57 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+from posts.models import Group, Post
+
+from .utils import OnCommitMixin
+
+User = get_user_model()
+CARD_TEMPLATE = 'posts/includes/post_card.html'
+
+
+class PostCardCacheTests(OnCommitMixin, TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(title='Группа', slug='group')
+        cls.post = Post.objects.create(
+            author=cls.user, group=cls.group, text='Карточка'
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+        self.index_url = reverse('posts:index')
+        self.group_url = reverse('posts:group_list', args=(self.group.slug,))
+
+    def test_card_is_shared_by_feeds(self):
+        """Карточка рендерится один раз для всех лент"""
+        response = self.authorized_client.get(self.index_url)
+        self.assertTemplateUsed(response, CARD_TEMPLATE)
+        for url in (
+            self.group_url,
+            reverse('posts:profile', args=(self.user.username,)),
+        ):
+            with self.subTest(url=url):
+                response = self.authorized_client.get(url)
+                self.assertTemplateNotUsed(response, CARD_TEMPLATE)
+                self.assertContains(response, 'Карточка')
+
+    def test_changes_render_card_again(self):
+        """Правка поста и переименование автора обновляют карточку"""
+        self.authorized_client.get(self.index_url)
+        self.post.text = 'Новый текст'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.post.save()
+        response = self.authorized_client.get(self.group_url)
+        self.assertTemplateUsed(response, CARD_TEMPLATE)
+        self.assertContains(response, 'Новый текст')
+        author = User.objects.get(pk=self.user.pk)
+        author.first_name = 'Лев'
+        with self.captureOnCommitCallbacks(execute=True):
+            author.save()
+        response = self.authorized_client.get(self.group_url)
+        self.assertContains(response, 'Автор: Лев')
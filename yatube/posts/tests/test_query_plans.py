@@ -0,0 +1,91 @@
+from unittest import skipUnless
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from posts import timeline
+from posts.models import Comment, Follow, Group, Post
+from posts.paginators import KeysetPaginator
+
+User = get_user_model()
+
+
+@skipUnless(connection.vendor == 'sqlite', 'EXPLAIN QUERY PLAN из SQLite')
+class QueryPlanTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='reader')
+        cls.author = User.objects.create_user(username='writer')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        cls.post = Post.objects.create(
+            author=cls.author, group=cls.group, text='Пост'
+        )
+        Comment.objects.create(
+            post=cls.post, author=cls.user, text='Комментарий'
+        )
+        Follow.objects.create(user=cls.user, author=cls.author)
+
+    def plan(self, queryset):
+        return self.explain(*queryset.query.sql_with_params())
+
+    def explain(self, sql, params=()):
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            return [row[-1] for row in cursor.fetchall()]
+
+    def assertUsesIndex(self, queryset, index):
+        self.assertPlanUsesIndex(self.plan(queryset), index)
+
+    def assertPlanUsesIndex(self, plan, index):
+        self.assertTrue(
+            any(index in step for step in plan), f'{index} не используется: '
+            f'{plan}'
+        )
+        for step in plan:
+            self.assertFalse(
+                step.startswith('SCAN') and 'INDEX' not in step,
+                f'Полный просмотр таблицы: {plan}'
+            )
+            self.assertNotIn('TEMP B-TREE', step, f'Сортировка: {plan}')
+
+    def test_feed_queries_use_indexes(self):
+        """Ленты читаются по индексу в порядке сортировки"""
+        feeds = {
+            'posts_post_pub_date': Post.objects.for_feed(),
+            'post_group_date_idx': self.group.posts.for_feed(),
+            'post_author_date_idx': self.author.posts.for_feed(),
+            'comment_post_created_idx':
+                self.post.comments.select_related('author'),
+        }
+        for index, queryset in feeds.items():
+            with self.subTest(index=index):
+                self.assertUsesIndex(queryset[:10], index)
+
+    def test_follow_queries_use_indexes(self):
+        """Подписки ищутся по уникальному и покрывающему индексам"""
+        self.assertUsesIndex(
+            Follow.objects.filter(user=self.user, author=self.author),
+            'sqlite_autoindex_posts_follow',
+        )
+        self.assertUsesIndex(
+            Follow.objects.filter(author=self.author).values('user_id'),
+            'COVERING INDEX follow_author_idx',
+        )
+        self.assertUsesIndex(
+            timeline.feed(self.user).for_feed()[:10],
+            'timeline_user_date_idx',
+        )
+
+    def test_follow_feed_keyset_page_uses_index(self):
+        """Страница ленты подписок после курсора читается по индексу ленты"""
+        paginator = KeysetPaginator(timeline.feed(self.user).for_feed(), 10)
+        cursor = paginator.cursor_for(paginator.object_list[0])
+        with CaptureQueriesContext(connection) as queries:
+            paginator.page(cursor)
+        self.assertPlanUsesIndex(
+            self.explain(queries[-1]['sql']), 'timeline_user_date_idx'
+        )
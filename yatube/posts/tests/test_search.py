@@ -0,0 +1,98 @@
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from posts import search
+from posts.models import Post
+from posts.stemmer import stem
+
+User = get_user_model()
+
+
+class StemmerTests(TestCase):
+    def test_word_forms_share_stem(self):
+        """Формы слова сводятся к одной основе"""
+        words = (
+            ('книга', 'книги', 'книгами'),
+            ('дневник', 'дневника', 'дневником'),
+            ('приехал', 'пріѣхалъ'),
+        )
+        for forms in words:
+            with self.subTest(forms=forms):
+                self.assertEqual(len({stem(word) for word in forms}), 1)
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+
+    def setUp(self):
+        self.guest_client = Client()
+        self.posts = [
+            Post.objects.create(author=self.user, text=text)
+            for text in (
+                'Начинаю новую тетрадь дневника',
+                'Дневник, дневник и снова дневники',
+                'Про котиков',
+            )
+        ]
+
+    def check_search(self):
+        first, second, third = self.posts
+        self.assertEqual(
+            [post_id for _, post_id in search.rank('дневник')],
+            [second.id, first.id]
+        )
+        self.assertEqual(search.rank('котик тетрадь'), [])
+        second.delete()
+        third.text = 'Котики ведут дневник'
+        third.save()
+        self.assertEqual(
+            {post_id for _, post_id in search.rank('дневники')},
+            {first.id, third.id}
+        )
+
+    def check_filter(self):
+        first, second, _ = self.posts
+        self.assertEqual(
+            set(search.filter_posts(Post.objects.all(), 'дневник')),
+            {first, second},
+        )
+        self.assertFalse(
+            search.filter_posts(Post.objects.all(), 'котик тетрадь')
+        )
+
+    def test_admin_filter_is_not_capped(self):
+        """Фильтр для админки находит все посты, FTS5 и Python"""
+        self.check_filter()
+        with self.settings(SEARCH_BACKEND='python'):
+            search.rebuild()
+            self.check_filter()
+
+    def test_fts5_search(self):
+        """Поиск через FTS5 находит формы слова и ранжирует результаты"""
+        self.assertTrue(search.use_fts5())
+        self.check_search()
+
+    @override_settings(SEARCH_BACKEND='python')
+    def test_python_search(self):
+        """Резервный индекс на Python ведёт себя так же"""
+        search.rebuild()
+        self.check_search()
+
+    def test_search_page_uses_cursors(self):
+        """Страница поиска листается курсорами"""
+        for i in range(10):
+            Post.objects.create(author=self.user, text=f'Дневник {i}')
+        response = self.guest_client.get(
+            reverse('posts:search'), {'q': 'дневник'}
+        )
+        page_obj = response.context['page_obj']
+        self.assertEqual(len(page_obj), 10)
+        response = self.guest_client.get(
+            reverse('posts:search'),
+            {'q': 'дневник', 'after': page_obj.next_cursor}
+        )
+        self.assertEqual(len(response.context['page_obj']), 2)
+        self.assertFalse(response.context['page_obj'].has_next())
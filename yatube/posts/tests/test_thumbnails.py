@@ -0,0 +1,89 @@
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from posts import thumbnails, versions
+from posts.models import Post
+from posts.templatetags.post_images import post_thumbnail
+
+User = get_user_model()
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ThumbnailTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.post = Post.objects.create(
+            author=cls.user,
+            text='Пост с картинкой',
+            image=SimpleUploadedFile('small.gif', SMALL_GIF, 'image/gif'),
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_tag_does_not_block_on_missing_thumbnail(self):
+        """Тег не создаёт миниатюру и не ставит её в очередь"""
+        with mock.patch.object(thumbnails, 'schedule') as schedule:
+            self.assertIsNone(post_thumbnail(self.post.image))
+        schedule.assert_not_called()
+        thumbnails.generate(self.post.image.name)
+        thumbnail = post_thumbnail(self.post.image)
+        self.assertEqual((thumbnail.width, thumbnail.height), (960, 339))
+
+    def test_pregenerate_thumbnails(self):
+        """Команда создаёт миниатюры для существующих картинок"""
+        out = StringIO()
+        call_command('pregenerate_thumbnails', '--workers=1', stdout=out)
+        self.assertIn('Миниатюр готово: 1', out.getvalue())
+        self.assertIsNotNone(thumbnails.cached(self.post.image))
+
+    def test_generated_thumbnail_refreshes_cached_pages(self):
+        """Готовая миниатюра сбрасывает кэш страницы поста"""
+        url = reverse('posts:post_detail', args=(self.post.pk,))
+        scope = versions.post_scope(self.post.pk)
+        self.client.get(url)
+        version = versions.get_version(scope)
+        thumbnail = thumbnails.generate(self.post.image.name)
+        self.assertGreater(versions.get_version(scope), version)
+        self.assertContains(self.client.get(url), thumbnail.url)
+        version = versions.get_version(scope)
+        thumbnails.generate(self.post.image.name)
+        self.assertEqual(versions.get_version(scope), version)
+
+    def test_failed_generation_is_raised(self):
+        """Ошибка миниатюры доходит до очереди задач, а команда идёт дальше"""
+        error = OSError('Нет места на диске')
+        with mock.patch.object(thumbnails, 'get_thumbnail', side_effect=error):
+            with self.assertRaises(OSError), self.assertLogs('posts'):
+                thumbnails.generate(self.post.image.name)
+            out = StringIO()
+            with self.assertLogs('posts'):
+                call_command(
+                    'pregenerate_thumbnails', '--workers=1', stdout=out
+                )
+        self.assertIn('Миниатюр готово: 0', out.getvalue())
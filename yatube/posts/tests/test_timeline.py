@@ -0,0 +1,101 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from posts.models import Follow, Post, TimelineEntry
+
+User = get_user_model()
+
+
+class TimelineTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='reader')
+        cls.author = User.objects.create_user(username='writer')
+        cls.old_post = Post.objects.create(author=cls.author, text='Старый')
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def test_follow_backfills_and_new_posts_fan_out(self):
+        """Подписка заполняет ленту, новые посты раскладываются по ней"""
+        self.authorized_client.get(
+            reverse('posts:profile_follow', args=(self.author.username,))
+        )
+        new_post = Post.objects.create(author=self.author, text='Новый')
+        self.assertEqual(
+            list(self.user.timeline.values_list('post_id', flat=True)),
+            [new_post.id, self.old_post.id]
+        )
+        response = self.authorized_client.get(reverse('posts:follow_index'))
+        self.assertEqual(
+            list(response.context['page_obj']), [new_post, self.old_post]
+        )
+
+    def test_unfollow_removes_author_posts(self):
+        """Отписка убирает посты автора из ленты"""
+        Follow.objects.create(user=self.user, author=self.author)
+        self.authorized_client.get(
+            reverse('posts:profile_unfollow', args=(self.author.username,))
+        )
+        self.assertFalse(TimelineEntry.objects.filter(user=self.user).exists())
+
+    @override_settings(TIMELINE_CELEBRITY_THRESHOLD=0)
+    def test_celebrity_posts_are_pulled_on_read(self):
+        """Посты популярных авторов подмешиваются при чтении"""
+        Follow.objects.create(user=self.user, author=self.author)
+        new_post = Post.objects.create(author=self.author, text='Новый')
+        self.assertFalse(TimelineEntry.objects.filter(user=self.user).exists())
+        response = self.authorized_client.get(reverse('posts:follow_index'))
+        self.assertEqual(
+            list(response.context['page_obj']), [new_post, self.old_post]
+        )
+
+    @override_settings(TIMELINE_MAX_LENGTH=2)
+    def test_fan_out_trims_timeline(self):
+        """Раскладка поста обрезает ленту до TIMELINE_MAX_LENGTH"""
+        Follow.objects.create(user=self.user, author=self.author)
+        posts = [
+            Post.objects.create(author=self.author, text=f'Пост {i}')
+            for i in range(5)
+        ]
+        self.assertEqual(
+            list(self.user.timeline.values_list('post_id', flat=True)),
+            [posts[4].id, posts[3].id]
+        )
+
+    def test_feed_pages_posts_with_equal_dates(self):
+        """Посты с одной датой не повторяются и не теряются между страницами"""
+        Follow.objects.create(user=self.user, author=self.author)
+        Post.objects.bulk_create(
+            Post(author=self.author, text=f'Пост {i}',
+                 pub_date=self.old_post.pub_date)
+            for i in range(15)
+        )
+        expected = list(Post.objects.order_by('-id'))
+        TimelineEntry.objects.filter(user=self.user).delete()
+        TimelineEntry.objects.bulk_create(
+            TimelineEntry(user=self.user, post=post, pub_date=post.pub_date)
+            for post in reversed(expected)
+        )
+        url = reverse('posts:follow_index')
+        first = self.authorized_client.get(url, {'after': ''})
+        cursor = first.context['page_obj'].next_cursor
+        pages = {
+            'keyset': (first, self.authorized_client.get(
+                url, {'after': cursor}
+            )),
+            'offset': (self.authorized_client.get(url), (
+                self.authorized_client.get(url, {'page': 2})
+            )),
+        }
+        for name, (first, second) in pages.items():
+            with self.subTest(pages=name):
+                self.assertEqual(
+                    list(first.context['page_obj'])
+                    + list(second.context['page_obj']),
+                    expected
+                )
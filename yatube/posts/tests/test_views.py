@@ -1,10 +1,13 @@
 from django import forms
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.test import Client, TestCase
 from django.urls import reverse
-from posts.models import Group, Post
+from posts.models import Comment, Follow, Group, Post
 from posts.views import NUMBER_OF_POSTS
 
+from .utils import QueryCountMixin
+
 User = get_user_model()
 
 
@@ -49,6 +52,7 @@ class PaginatorViewsTests(TestCase):
         )
 
     def setUp(self):
+        cache.clear()
         self.authorized_client = Client()
         self.authorized_client.force_login(self.user)
 
@@ -177,3 +181,65 @@ class PostsViewAdditionalTests(TestCase):
         self.assertEqual(
             response.context['group'].description, self.group.description
         )
+
+
+class FeedQueryCountTests(QueryCountMixin, TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.author = User.objects.create_user(
+            username='writer', first_name='Лев', last_name='Толстой'
+        )
+        cls.group = Group.objects.create(
+            title='Название группы',
+            slug='test-slug',
+            description='Описание группы',
+        )
+        Follow.objects.create(user=cls.user, author=cls.author)
+        cls.post = Post.objects.create(
+            author=cls.author, text='Пост', group=cls.group
+        )
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def add_posts(self):
+        start = Group.objects.count()
+        for i in range(start, start + NUMBER_OF_POSTS):
+            author = User.objects.create_user(username=f'author-{i}')
+            group = Group.objects.create(
+                title=f'Группа {i}', slug=f'group-{i}', description='-'
+            )
+            Post.objects.create(author=author, text=f'Пост {i}', group=group)
+            Post.objects.create(
+                author=self.author, text=f'Пост {i}', group=group
+            )
+
+    def test_feed_query_count_does_not_depend_on_posts(self):
+        """Число запросов ленты не растёт вместе с числом постов"""
+        urls_queries = (
+            (reverse('posts:index'), 4),
+            (reverse('posts:group_list', args=(self.group.slug,)), 5),
+            (reverse('posts:profile', args=(self.author.username,)), 5),
+            (reverse('posts:follow_index'), 6),
+        )
+        self.add_posts()
+        for url, num in urls_queries:
+            with self.subTest(url=url):
+                self.assertPageQueries(
+                    self.authorized_client, url, num, grow=self.add_posts
+                )
+
+    def test_post_detail_query_count(self):
+        """Страница поста не делает запросов на каждый комментарий"""
+        url = reverse('posts:post_detail', args=(self.post.id,))
+
+        def add_comments():
+            start = Comment.objects.count()
+            for i in range(start, start + 5):
+                author = User.objects.create_user(username=f'commenter-{i}')
+                Comment.objects.create(post=self.post, author=author, text='-')
+
+        self.assertPageQueries(self.authorized_client, url, 7, add_comments)
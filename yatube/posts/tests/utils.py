@@ -0,0 +1,48 @@
+from contextlib import contextmanager
+
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connection, connections
+from django.test.utils import CaptureQueriesContext
+
+
+class OnCommitMixin:
+    """TestCase не коммитит транзакцию, поэтому колбэки on_commit, которые
+    сбрасывают кэш (posts/signals.py), надо выполнить явно.
+    """
+
+    @contextmanager
+    def captureOnCommitCallbacks(self, *, using=DEFAULT_DB_ALIAS,
+                                 execute=False):
+        # То же, что TestCase.captureOnCommitCallbacks из Django 3.2.
+        callbacks = []
+        start_count = len(connections[using].run_on_commit)
+        try:
+            yield callbacks
+        finally:
+            run_on_commit = connections[using].run_on_commit[start_count:]
+            callbacks[:] = [func for sids, func in run_on_commit]
+            if execute:
+                for callback in callbacks:
+                    callback()
+
+
+class QueryCountMixin:
+    """Проверки числа SQL-запросов, которое стоит страница."""
+
+    def get_with_queries(self, client, url):
+        cache.clear()
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(url)
+        return response, len(context.captured_queries)
+
+    def assertPageQueries(self, client, url, num, grow=None):
+        """Страница стоит ровно num запросов и после вызова grow()."""
+        response, queries = self.get_with_queries(client, url)
+        self.assertEqual(queries, num, f'{url}: {queries} запросов')
+        if grow is not None:
+            grow()
+            response, queries = self.get_with_queries(client, url)
+            self.assertEqual(
+                queries, num, f'{url}: {queries} запросов после grow()'
+            )
+        return response
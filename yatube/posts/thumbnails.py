@@ -0,0 +1,76 @@
+"""Заблаговременная генерация миниатюр картинок постов.
+
+Миниатюры создаются фоновой задачей (core.jobs) сразу после загрузки
+картинки; шаблоны берут только готовые миниатюры и никогда не ждут
+Pillow во время рендеринга. Готовая миниатюра сбрасывает кэш фрагментов
+и страниц поста, иначе они до истечения показывали бы оригинал.
+"""
+import logging
+
+from core import jobs, page_cache
+from sorl.thumbnail import default, get_thumbnail
+from sorl.thumbnail.base import ThumbnailBackend
+from sorl.thumbnail.conf import defaults as default_settings
+from sorl.thumbnail.conf import settings as sorl_settings
+from sorl.thumbnail.images import ImageFile
+
+from . import pages, versions
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+GEOMETRY = '960x339'
+OPTIONS = {'crop': 'center', 'upscale': True}
+
+
+class CachedThumbnailBackend(ThumbnailBackend):
+    def get_cached_thumbnail(self, file_, geometry_string, **options):
+        """Миниатюра из key-value хранилища sorl или None, без генерации."""
+        source = ImageFile(file_)
+        if sorl_settings.THUMBNAIL_PRESERVE_FORMAT:
+            options.setdefault('format', self._get_format(source))
+        for key, value in self.default_options.items():
+            options.setdefault(key, value)
+        for key, attr in self.extra_options:
+            value = getattr(sorl_settings, attr)
+            if value != getattr(default_settings, attr):
+                options.setdefault(key, value)
+        name = self._get_thumbnail_filename(source, geometry_string, options)
+        return default.kvstore.get(ImageFile(name, default.storage))
+
+
+backend = CachedThumbnailBackend()
+
+
+def cached(image):
+    return backend.get_cached_thumbnail(image, GEOMETRY, **OPTIONS)
+
+
+def refresh(name):
+    """Сбрасывает кэш постов с картинкой name."""
+    for post in Post.objects.filter(image=name).only('author_id', 'group_id'):
+        versions.bump(*versions.post_scopes(post))
+        page_cache.purge(*pages.feed_pages(post))
+
+
+@jobs.task
+def generate(name):
+    """Создаёт миниатюру; ошибка пробрасывается, чтобы очередь повторила
+    задачу.
+    """
+    thumbnail = cached(name)
+    if thumbnail is not None:
+        return thumbnail
+    try:
+        thumbnail = get_thumbnail(name, GEOMETRY, **OPTIONS)
+    except Exception:
+        logger.exception('Не удалось создать миниатюру %s', name)
+        raise
+    refresh(name)
+    return thumbnail
+
+
+def schedule(image):
+    """Ставит генерацию миниатюры в очередь фоновых задач."""
+    if image:
+        jobs.enqueue(generate, image.name)
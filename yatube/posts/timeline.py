@@ -0,0 +1,174 @@
+"""Лента подписок, материализованная при записи (fan-out on write).
+
+Новый пост раскладывается в TimelineEntry каждого подписчика автора,
+поэтому follow_index читает ленту одним диапазоном по индексу
+(user, -pub_date, -post). Авторы, у которых подписчиков больше
+TIMELINE_CELEBRITY_THRESHOLD, не раскладываются: их посты
+подмешиваются в ленту при чтении.
+"""
+import operator
+from functools import reduce
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Count, F, OuterRef, Q, Subquery
+
+from . import follows
+from .models import Follow, Post, TimelineEntry, User
+
+FOLLOWERS_COUNT_KEY = 'timeline:followers:{}'
+TRIM_BATCH_SIZE = 100
+FEED_ORDERING = ('-timeline_date', '-timeline_post')
+
+
+def followers_count(author_id) -> int:
+    key = FOLLOWERS_COUNT_KEY.format(author_id)
+    count = cache.get(key)
+    if count is None:
+        count = Follow.objects.filter(author_id=author_id).count()
+        cache.set(key, count)
+    return count
+
+
+def reset_followers_count(author_id):
+    cache.delete(FOLLOWERS_COUNT_KEY.format(author_id))
+
+
+def is_celebrity(author_id) -> bool:
+    return followers_count(author_id) > settings.TIMELINE_CELEBRITY_THRESHOLD
+
+
+def celebrities(author_ids) -> list:
+    keys = {FOLLOWERS_COUNT_KEY.format(pk): pk for pk in author_ids}
+    counts = {keys[key]: count for key, count in cache.get_many(keys).items()}
+    missing = set(keys.values()) - counts.keys()
+    if missing:
+        # Счётчики всех авторов, которых нет в кэше, одним GROUP BY.
+        found = dict.fromkeys(missing, 0)
+        found.update(Follow.objects.filter(
+            author_id__in=missing
+        ).order_by().values('author_id').annotate(
+            count=Count('id')
+        ).values_list('author_id', 'count'))
+        cache.set_many({
+            FOLLOWERS_COUNT_KEY.format(pk): count
+            for pk, count in found.items()
+        })
+        counts.update(found)
+    threshold = settings.TIMELINE_CELEBRITY_THRESHOLD
+    return [pk for pk in keys.values() if counts[pk] > threshold]
+
+
+def fan_out(post):
+    if is_celebrity(post.author_id):
+        return
+    follower_ids = list(Follow.objects.filter(
+        author_id=post.author_id
+    ).values_list('user_id', flat=True))
+    TimelineEntry.objects.bulk_create(
+        (TimelineEntry(user_id=user_id, post=post, pub_date=post.pub_date)
+         for user_id in follower_ids),
+        ignore_conflicts=True,
+    )
+    trim(*follower_ids)
+
+
+def trim(*user_ids):
+    """Оставляет в лентах user_ids по TIMELINE_MAX_LENGTH свежих записей.
+
+    Переполненные ленты находятся одним запросом, лишние записи
+    удаляются одним DELETE на TRIM_BATCH_SIZE лент.
+    """
+    length = settings.TIMELINE_MAX_LENGTH
+    cutoffs = TimelineEntry.objects.filter(
+        user_id=OuterRef('pk')
+    ).order_by('-pub_date').values('pub_date')[length:length + 1]
+    overflowing = list(User.objects.filter(pk__in=user_ids).annotate(
+        cutoff=Subquery(cutoffs)
+    ).filter(cutoff__isnull=False).values_list('pk', 'cutoff'))
+    for start in range(0, len(overflowing), TRIM_BATCH_SIZE):
+        batch = overflowing[start:start + TRIM_BATCH_SIZE]
+        TimelineEntry.objects.filter(reduce(operator.or_, (
+            Q(user_id=user_id, pub_date__lte=cutoff)
+            for user_id, cutoff in batch
+        ))).delete()
+
+
+def backfill(user_id, author_id):
+    posts = Post.objects.filter(author_id=author_id).values_list(
+        'id', 'pub_date'
+    )[:settings.TIMELINE_MAX_LENGTH]
+    TimelineEntry.objects.bulk_create(
+        (TimelineEntry(user_id=user_id, post_id=post_id, pub_date=pub_date)
+         for post_id, pub_date in posts),
+        ignore_conflicts=True,
+    )
+    trim(user_id)
+
+
+def follow(user_id, author_id):
+    reset_followers_count(author_id)
+    if not is_celebrity(author_id):
+        backfill(user_id, author_id)
+
+
+def unfollow(user_id, author_id):
+    reset_followers_count(author_id)
+    TimelineEntry.objects.filter(
+        user_id=user_id, post__author_id=author_id
+    ).delete()
+    if followers_count(author_id) == settings.TIMELINE_CELEBRITY_THRESHOLD:
+        # Автор только что перестал быть «знаменитостью»: его посты
+        # больше не подмешиваются при чтении, раскладываем их заранее.
+        for follower_id in Follow.objects.filter(
+            author_id=author_id
+        ).values_list('user_id', flat=True):
+            backfill(follower_id, author_id)
+
+
+def rebuild(user_id):
+    TimelineEntry.objects.filter(user_id=user_id).delete()
+    author_ids = set(Follow.objects.filter(user_id=user_id).values_list(
+        'author_id', flat=True
+    ))
+    author_ids -= set(celebrities(author_ids))
+    if not author_ids:
+        return
+    # Одним INSERT ... SELECT: свежие посты всех авторов сразу, без
+    # выборки строк в Python и без trim() после каждого автора.
+    posts = Post.objects.filter(author_id__in=author_ids).order_by(
+        '-pub_date', '-id'
+    ).values_list('id', 'pub_date')[:settings.TIMELINE_MAX_LENGTH]
+    sql, params = posts.query.sql_with_params()
+    quote = connection.ops.quote_name
+    meta = TimelineEntry._meta
+    columns = ', '.join(
+        quote(meta.get_field(name).column)
+        for name in ('user', 'post', 'pub_date')
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {quote(meta.db_table)} ({columns}) '
+            f'SELECT %s, * FROM ({sql}) AS recent',
+            (user_id, *params),
+        )
+
+
+def feed(user):
+    """Посты ленты подписок пользователя.
+
+    Без знаменитостей лента сортируется по столбцам самой записи ленты
+    (FEED_ORDERING): тогда порядок даёт индекс (user, -pub_date, -post),
+    без сортировки строк, а post_id различает посты с одной датой.
+    """
+    pulled = celebrities(follows.followed_ids(user))
+    if not pulled:
+        return Post.objects.filter(timeline_entries__user=user).annotate(
+            timeline_date=F('timeline_entries__pub_date'),
+            timeline_post=F('timeline_entries__post'),
+        ).order_by(*FEED_ORDERING)
+    return Post.objects.filter(
+        Q(id__in=TimelineEntry.objects.filter(user=user).values('post_id'))
+        | Q(author_id__in=pulled)
+    )
@@ -0,0 +1,87 @@
+"""Поколения кэша лент.
+
+Каждая лента (global, group:<id>, author:<id>) имеет счётчик-поколение,
+который входит в ключ кэшированных фрагментов. Изменение поста,
+комментария или группы увеличивает поколения затронутых лент, поэтому
+фрагменты можно хранить часами и при этом сбрасывать мгновенно.
+Вместе с поколением запоминается время изменения: из него view
+отдают Last-Modified (см. posts/conditional.py).
+"""
+import time
+
+from django.core.cache import cache
+
+VERSION_KEY = 'feed_version:{}'
+CHANGED_KEY = 'feed_changed:{}'
+GLOBAL = 'global'
+
+
+def group_scope(group_id) -> str:
+    return f'group:{group_id}'
+
+
+def author_scope(author_id) -> str:
+    return f'author:{author_id}'
+
+
+def post_scope(post_id) -> str:
+    return f'post:{post_id}'
+
+
+def follows_scope(user_id) -> str:
+    return f'follows:{user_id}'
+
+
+def post_scopes(post) -> set:
+    scopes = {GLOBAL, author_scope(post.author_id)}
+    if post.pk:
+        scopes.add(post_scope(post.pk))
+    if post.group_id:
+        scopes.add(group_scope(post.group_id))
+    return scopes
+
+
+def _initial() -> int:
+    # Вытесненное из кэша поколение начинается заново с текущего времени,
+    # чтобы не совпасть ни с одним из уже выданных значений.
+    return int(time.time() * 1000)
+
+
+def get_versions(*scopes) -> dict:
+    keys = {VERSION_KEY.format(scope): scope for scope in scopes}
+    found = cache.get_many(keys)
+    versions = {}
+    for key, scope in keys.items():
+        if key not in found:
+            cache.add(key, _initial(), None)
+            found[key] = cache.get(key)
+        versions[scope] = found[key]
+    return versions
+
+
+def get_version(scope) -> int:
+    return get_versions(scope)[scope]
+
+
+def last_changed(*scopes) -> float:
+    """Время последнего изменения самой свежей из лент."""
+    keys = [CHANGED_KEY.format(scope) for scope in scopes]
+    found = cache.get_many(keys)
+    missing = {key: time.time() for key in keys if key not in found}
+    if missing:
+        # Время вытесненной записи неизвестно, считаем, что изменение
+        # было только что: лишний 200 лучше ложного 304.
+        cache.set_many(missing, None)
+        found.update(missing)
+    return max(found.values(), default=0.0)
+
+
+def bump(*scopes):
+    for scope in scopes:
+        key = VERSION_KEY.format(scope)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, _initial(), None)
+    now = time.time()
+    cache.set_many({CHANGED_KEY.format(scope): now for scope in scopes}, None)
@@ -1,64 +1,123 @@
+from functools import partial
+
+from core.page_cache import cacheable_page
+from core.routers import pins_primary, read_from_replica
+from django.conf import settings
 from django.contrib.auth.decorators import login_required
-from django.core.paginator import Paginator
+from django.http import JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
+from django.template.loader import render_to_string
 
+from . import search as post_search
+from . import (conditional, counters, feeds, lookups, pages, thumbnails,
+               timeline, versions)
 from .forms import CommentForm, PostForm
-from .models import Follow, Group, Post, User
+from .models import Comment, Follow, Post
+from .paginators import COMMENT_ORDERING, KeysetPaginator, WindowPaginator
 
 NUMBER_OF_POSTS: int = 10
-
-
+NUMBER_OF_COMMENTS: int = 20
+
+
+def feed_count(scope, posts_list):
+    return partial(counters.feed_count, scope, posts_list.count)
+
+
+def get_page_obj(request, posts_list, count=None, scopes=None):
+    if settings.POSTS_KEYSET_PAGINATION or 'after' in request.GET:
+        paginator = KeysetPaginator(
+            posts_list,
+            NUMBER_OF_POSTS,
+            approximate_count=settings.POSTS_APPROXIMATE_COUNT,
+        )
+        return paginator.get_page(request.GET.get('after'))
+    if scopes is not None:
+        paginator = feeds.FeedPaginator(
+            posts_list, NUMBER_OF_POSTS, count,
+            conditional.scope_versions(request, scopes),
+        )
+        return paginator.get_page(request.GET.get('page'))
+    paginator = WindowPaginator(posts_list, NUMBER_OF_POSTS, count)
+    return paginator.get_page(request.GET.get('page'))
+
+
+@read_from_replica
+@cacheable_page
+@conditional.scope_condition(conditional.index_scopes)
 def index(request):
     template = 'posts/index.html'
-    posts_list = Post.objects.all()
-    paginator = Paginator(posts_list, NUMBER_OF_POSTS)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    posts_list = Post.objects.for_feed()
+    page_obj = get_page_obj(
+        request, posts_list, feed_count(versions.GLOBAL, posts_list),
+        {versions.GLOBAL},
+    )
     context = {
         'page_obj': page_obj,
+        'index': True,
+        'feed_version': versions.get_version(versions.GLOBAL),
+        'feed_cache_timeout': settings.FEED_CACHE_TIMEOUT,
     }
     return render(request, template, context)
 
 
+@read_from_replica
+@cacheable_page
+@conditional.scope_condition(conditional.group_scopes)
 def group_posts(request, slug):
     template = 'posts/group_list.html'
-    group = get_object_or_404(Group, slug=slug)
-    posts_list = group.posts.all()
-    paginator = Paginator(posts_list, NUMBER_OF_POSTS)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    group = lookups.get_group_or_404(slug)
+    posts_list = Post.objects.filter(group_id=group.id).for_feed()
+    scope = versions.group_scope(group.id)
+    page_obj = get_page_obj(
+        request, posts_list, feed_count(scope, posts_list), {scope}
+    )
     context = {
         'group': group,
-        'page_obj': page_obj
+        'page_obj': page_obj,
+        'feed_version': versions.get_version(scope),
+        'feed_cache_timeout': settings.FEED_CACHE_TIMEOUT,
     }
     return render(request, template, context)
 
 
+@read_from_replica
+@cacheable_page
+@conditional.scope_condition(conditional.profile_scopes)
 def profile(request, username):
-    profile_user = get_object_or_404(User, username=username)
+    profile_user = lookups.get_user_or_404(username)
     user = request.user
-    posts_count = profile_user.posts.count()
-    posts_list_username = profile_user.posts.all()
-    paginator = Paginator(posts_list_username, NUMBER_OF_POSTS)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
-    following = False
-    if user.is_authenticated:
-        following = None
-        if profile_user != user:
-            following = False
-            if profile_user.following.exists():
-                following = True
+    posts_list_username = Post.objects.filter(
+        author_id=profile_user.id
+    ).for_feed()
+    scope = versions.author_scope(profile_user.id)
+    posts_count = counters.posts_count(profile_user)
+    page_obj = get_page_obj(
+        request, posts_list_username, lambda: posts_count, {scope},
+    )
     context = {
         'user': user,
-        'following': following,
         'profile_user': profile_user,
         'page_obj': page_obj,
         'posts_count': posts_count,
+        'feed_version': versions.get_version(scope),
+        'feed_cache_timeout': settings.FEED_CACHE_TIMEOUT,
     }
     return render(request, 'posts/profile.html', context)
 
 
+def search(request):
+    query = request.GET.get('q', '').strip()
+    page_obj = post_search.search(
+        query, request.GET.get('after'), NUMBER_OF_POSTS
+    )
+    context = {
+        'query': query,
+        'page_obj': page_obj,
+    }
+    return render(request, 'posts/search.html', context)
+
+
+@pins_primary
 @login_required
 def add_comment(request, post_id):
     post = get_object_or_404(Post, id=post_id)
@@ -71,10 +130,15 @@ def add_comment(request, post_id):
     return redirect('posts:post_detail', post_id)
 
 
+@read_from_replica
+@cacheable_page(variant=pages.author_version)
+@conditional.scope_condition(conditional.post_scopes)
 def post_detail(request, post_id):
-    post_user = get_object_or_404(Post, id=post_id)
-    posts_count = post_user.author.posts.count()
-    comments = post_user.comments.filter(post_id=post_id)
+    post_user = get_object_or_404(
+        Post.objects.select_related('author__profile', 'group'), id=post_id
+    )
+    posts_count = counters.posts_count(post_user.author)
+    comments = get_comments_page(post_user.id, request.GET.get('after'))
     form_comments = CommentForm(request.POST or None)
     context = {
         'post_user': post_user,
@@ -85,18 +149,47 @@ def post_detail(request, post_id):
     return render(request, 'posts/post_detail.html', context)
 
 
+def get_comments_page(post_id, cursor=None):
+    comments = Comment.objects.filter(post_id=post_id).select_related(
+        'author'
+    ).only('id', 'text', 'created', 'post', 'author__username')
+    paginator = KeysetPaginator(
+        comments, NUMBER_OF_COMMENTS, ordering=COMMENT_ORDERING
+    )
+    return paginator.get_page(cursor)
+
+
+@read_from_replica
+@cacheable_page
+@conditional.scope_condition(conditional.comments_scopes)
+def post_comments(request, post_id):
+    post = get_object_or_404(Post.objects.only('id'), id=post_id)
+    comments = get_comments_page(post.id, request.GET.get('after'))
+    return JsonResponse({
+        'html': render_to_string(
+            'posts/includes/comments.html',
+            {'comments': comments, 'post_id': post.id},
+            request=request,
+        ),
+        'next': comments.next_cursor,
+    })
+
+
+@pins_primary
 @login_required
 def post_create(request):
-    form = PostForm(request.POST or None)
+    form = PostForm(request.POST or None, files=request.FILES or None)
     if form.is_valid():
         post = form.save(commit=False)
         post.author = request.user
         post.save()
+        thumbnails.schedule(post.image)
         return redirect('posts:profile', request.user)
 
     return render(request, 'posts/create_post.html', {'form': form})
 
 
+@pins_primary
 @login_required
 def post_edit(request, post_id):
     post = get_object_or_404(Post, id=post_id)
@@ -112,6 +205,7 @@ def post_edit(request, post_id):
         post = form.save(commit=False)
         post.author = request.user
         post.save()
+        thumbnails.schedule(post.image)
         return redirect('posts:post_detail', post.id)
 
     is_edit = post.text
@@ -123,25 +217,28 @@ def post_edit(request, post_id):
     return render(request, 'posts/create_post.html', context)
 
 
+@read_from_replica
 @login_required
+@conditional.scope_condition(conditional.follow_scopes)
 def follow_index(request):
-    author_ids = Follow.objects.filter(user=request.user).values_list(
-        'author_id',
-        flat=True
+    posts_list = timeline.feed(request.user).for_feed()
+    page_obj = get_page_obj(
+        request, posts_list,
+        partial(counters.follow_feed_count, request.user),
+        conditional.follow_scopes(request)
+        | {versions.follows_scope(request.user.pk)},
     )
-    posts_list = Post.objects.filter(author_id__in=author_ids)
-    paginator = Paginator(posts_list, NUMBER_OF_POSTS)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
     context = {
-        'page_obj': page_obj
+        'page_obj': page_obj,
+        'follow': True,
     }
     return render(request, 'posts/follow.html', context)
 
 
+@pins_primary
 @login_required
 def profile_follow(request, username):
-    author = get_object_or_404(User, username=username)
+    author = lookups.get_user_or_404(username)
     if author != request.user:
         Follow.objects.get_or_create(user=request.user, author=author)
         return redirect('posts:profile', author.username)
@@ -149,8 +246,9 @@ def profile_follow(request, username):
         return redirect('posts:profile', author.username)
 
 
+@pins_primary
 @login_required
 def profile_unfollow(request, username):
-    author = get_object_or_404(User, username=username)
+    author = lookups.get_user_or_404(username)
     Follow.objects.filter(user=request.user, author=author).delete()
     return redirect('posts:profile', author.username)
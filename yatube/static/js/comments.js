@@ -0,0 +1,13 @@
+document.addEventListener('click', function (event) {
+  var link = event.target.closest('.js-more-comments');
+  if (!link) {
+    return;
+  }
+  event.preventDefault();
+  fetch(link.dataset.url, {headers: {'X-Requested-With': 'XMLHttpRequest'}})
+    .then(function (response) { return response.json(); })
+    .then(function (data) {
+      link.insertAdjacentHTML('afterend', data.html);
+      link.remove();
+    });
+});
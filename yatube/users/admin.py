@@ -1 +1,11 @@
-# Register your models here.
+from django.contrib import admin
+
+from .models import Profile
+
+
+class ProfileAdmin(admin.ModelAdmin):
+    list_display = ('pk', 'user', 'posts_count')
+    search_fields = ('user__username',)
+
+
+admin.site.register(Profile, ProfileAdmin)
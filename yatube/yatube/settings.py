@@ -40,6 +40,7 @@ INSTALLED_APPS = [
     'users.apps.UsersConfig',
     'posts.apps.PostsConfig',
     'about.apps.AboutConfig',
+    'benchmarks.apps.BenchmarksConfig',
     'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
@@ -51,11 +52,14 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.middleware.PageCacheMiddleware',
+    'core.middleware.ReplicaRoutingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'debug_toolbar.middleware.DebugToolbarMiddleware',
@@ -66,7 +70,7 @@ ROOT_URLCONF = 'yatube.urls'
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'core.backends.templates.TimedDjangoTemplates',
         'DIRS': [TEMPLATES_DIR],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -83,6 +87,9 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'yatube.wsgi.application'
 
+# Потоки, в которых ASGI-приложение (yatube/asgi.py) выполняет запросы
+ASGI_THREADS = int(os.environ.get('YATUBE_ASGI_THREADS', 8))
+
 
 # Database
 # https://docs.djangoproject.com/en/2.2/ref/settings/#databases
@@ -90,10 +97,30 @@ WSGI_APPLICATION = 'yatube.wsgi.application'
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        'NAME': os.environ.get(
+            'YATUBE_DB_NAME', os.path.join(BASE_DIR, 'db.sqlite3')
+        ),
     }
 }
 
+# Реплики для чтения: YATUBE_DB_REPLICAS — пути к копиям базы через
+# запятую. Их синхронизация — забота окружения; в тестах реплики
+# смотрят в тестовую базу default. См. core/routers.py
+DATABASE_REPLICAS = []
+for number, name in enumerate(
+    filter(None, os.environ.get('YATUBE_DB_REPLICAS', '').split(',')), 1
+):
+    DATABASES[f'replica{number}'] = {
+        **DATABASES['default'],
+        'NAME': name,
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(f'replica{number}')
+DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
+REPLICA_PIN_SECONDS = 10
+REPLICA_LAG_SECONDS = 10
+REPLICA_RETRY_SECONDS = 30
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
@@ -138,18 +165,101 @@ LOGIN_URL = 'users:login'
 LOGOUT_URL = 'users:logout'
 LOGIN_REDIRECT_URL = 'posts:index'
 
-EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
+# Письма отправляются фоновой задачей через JOBS_EMAIL_BACKEND
+EMAIL_BACKEND = 'core.backends.email.QueuedEmailBackend'
+JOBS_EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
-CACHES = {
-    'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-    }
+
+# Кэш выбирается переменной окружения YATUBE_CACHE: locmem (по умолчанию),
+# file, memcached или redis (нужен пакет django-redis). Общий кэш
+# прикрывается LRU-кэшем процесса, см. core/cache.py
+CACHE_BACKENDS = {
+    'file': (
+        'django.core.cache.backends.filebased.FileBasedCache',
+        os.path.join(BASE_DIR, 'cache'),
+    ),
+    'memcached': (
+        'django.core.cache.backends.memcached.MemcachedCache',
+        '127.0.0.1:11211',
+    ),
+    'redis': (
+        'django_redis.cache.RedisCache',
+        'redis://127.0.0.1:6379/1',
+    ),
 }
+CACHE_BACKEND = os.environ.get('YATUBE_CACHE', 'locmem')
+# Ключи, которые меняются или удаляются на месте, а не получают новое
+# имя с поколением: из кэша процесса другие процессы их не сбросят
+CACHE_LOCAL_EXCLUDE_PREFIXES = (
+    'feed_version:', 'feed_changed:', 'page_version:', 'feed_post:',
+    'feed_author:', 'feed_group:', 'feed_count:', 'lookup:', 'follows:',
+)
+if CACHE_BACKEND in CACHE_BACKENDS:
+    backend, location = CACHE_BACKENDS[CACHE_BACKEND]
+    CACHES = {
+        'default': {
+            'BACKEND': 'core.cache.TwoTierCache',
+            'OPTIONS': {
+                'SHARED': 'shared',
+                'LOCAL_MAX_ENTRIES': 1000,
+                'LOCAL_TIMEOUT': 5,
+                'LOCAL_EXCLUDE_PREFIXES': CACHE_LOCAL_EXCLUDE_PREFIXES,
+            },
+        },
+        'shared': {
+            'BACKEND': backend,
+            'LOCATION': os.environ.get('YATUBE_CACHE_LOCATION', location),
+        },
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# Гистограммы времени ответа, см. manage.py dump_request_metrics
+REQUEST_METRICS_DIR = os.environ.get(
+    'YATUBE_METRICS_DIR', os.path.join(BASE_DIR, 'metrics')
+)
+
+# Пагинация лент: keyset-курсоры ?after= вместо ?page=
+POSTS_KEYSET_PAGINATION = False
+POSTS_APPROXIMATE_COUNT = False
+
+# Фоновые задачи, см. core/jobs.py и manage.py run_jobs. JOBS_EAGER
+# выполняет задачи в процессе после коммита, без воркера
+JOBS_EAGER = False
+JOBS_WORKERS = 4
+JOBS_VISIBILITY_TIMEOUT = 5 * 60
+JOBS_MAX_ATTEMPTS = 5
+JOBS_RETRY_DELAY = 10
+
+# Фрагменты лент сбрасываются по поколениям, см. posts/versions.py
+FEED_CACHE_TIMEOUT = 60 * 60 * 6
+
+# Страницы целиком; сбрасываются сигналами при изменении постов,
+# комментариев, групп и подписок. Авторизованным пользователям страница
+# собирается из общей заготовки и личных фрагментов. 0 — выключено
+ANONYMOUS_PAGE_CACHE_TIMEOUT = 60 * 60
+USER_PAGE_CACHE_TIMEOUT = 60 * 60
+# Валидаторы личных фрагментов страницы, см. core/page_cache.py
+PAGE_CACHE_VIEWER_VALIDATORS = 'posts.conditional.viewer_validators'
+
+# Поиск по постам: auto (FTS5 на SQLite, иначе таблица SearchTerm),
+# fts5 или python
+SEARCH_BACKEND = 'auto'
+
+# Лента подписок: авторы с большим числом подписчиков не раскладываются
+# по лентам при записи, а подмешиваются при чтении
+TIMELINE_CELEBRITY_THRESHOLD = 1000
+TIMELINE_MAX_LENGTH = 1000
+
 INTERNAL_IPS = [
     '127.0.0.1',
 ]